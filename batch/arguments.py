@@ -0,0 +1,35 @@
+'''
+Command-line options shared by the scripts in this directory, so that every
+script names and documents them the same way. Only argparse-level code lives
+here, so importing it costs nothing.
+'''
+
+import os
+
+def add_tree_arguments(parser, norm_type=True, directory=True):
+    ''' Adds the options of scripts that read all runs under a result tree:
+    --dir, unless the trees are positional arguments, --run_type, --processor,
+    --processor_from_dir and --norm_type.
+    '''
+    if directory:
+        parser.add_argument('--dir', default = os.getcwd(), help = "Root of the result tree")
+    parser.add_argument("--run_type", default = "batch_solver", help = "\'spmv\' or \'batch_solver\'")
+    parser.add_argument('--processor', default='CPU', help = "Processor on which runs were performed")
+    parser.add_argument('--processor_from_dir', action="store_true",
+            help = "Take the processor from the first directory level of the result tree")
+    if norm_type:
+        parser.add_argument('--norm_type', default = "relative", help = "\'absolute\' or \'relative\' norm")
+
+def add_cache_argument(parser):
+    parser.add_argument('--cache', help = "Reuse data extracted by earlier runs from unchanged files",
+            action="store_true")
+
+def add_plot_arguments(parser, stream=False):
+    ''' Adds the options of the plotting scripts reading the files in the current
+    directory: --jobs and --cache, and --stream if they read per-entry data.
+    '''
+    if stream:
+        parser.add_argument('--stream', help = "Read files incrementally, for very large batches",
+                action="store_true")
+    parser.add_argument('--jobs', type=int, default=1, help = "Number of processes rendering figures")
+    add_cache_argument(parser)
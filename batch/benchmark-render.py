@@ -0,0 +1,111 @@
+#! /bin/env python3
+
+'''
+Benchmarks figure rendering over many synthetic cases: a fresh figure per case
+(render_figure) against reusing one figure per layout (render_with_templates).
+Each mode runs in its own process, which reports its time, and its resident and
+peak memory at --checkpoints evenly spaced points of the run, to show whether
+memory levels off. The files from both modes are compared byte by byte.
+'''
+
+import os
+import time
+import filecmp
+import argparse
+import resource
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from render import line_spec, figure_spec, render_figure, iter_render_with_templates
+
+opts = { \
+     "marklist" : ['.', 'x', '+', '^', 'v', '<', '>', 'd'],
+     "colorlist" : ['k', 'b', 'r', 'g', 'c', 'm', 'orange', 'pink'],
+     "linetype" : ['-', '--', '-.', ':', '--', '-.', '--',':'],
+     "linewidth" : 0.75,
+     "marksize" : 5,
+     "markedgewidth" : 1 \
+     }
+
+solver_keys = ['bicgstab', 'gmres', 'direct']
+
+def get_synthetic_specs(num_cases, outdir):
+    ''' Alternates cases shaped like plot-batch-timings-general.py (log timings
+    against batch size) and like plot-batch-json-iters.py (iterations per entry).
+    '''
+    rng = np.random.default_rng(0)
+    specs = []
+    batchsizes = 192.0*np.array([1, 2, 4, 8, 16])
+    for icase in range(num_cases):
+        lines = []
+        if icase % 2 == 0:
+            for isolver in range(len(solver_keys)):
+                timings = batchsizes*rng.uniform(1e-4, 1e-3)*(isolver+1)
+                lines.append(line_spec('semilogy', batchsizes, timings, opts, isolver, solver_keys[isolver]))
+            grid = [(('on',), {'which': 'both'}), (('on',), {'which': 'minor', 'ls': ':', 'color': '0.5'})]
+            specs.append(figure_spec(os.path.join(outdir, "case" + str(icase) + "-timings.png"), lines,
+                    "No. matrices in the batch", "Time (ms)", rcparams={'font.size': 12},
+                    legend={'loc': "best", 'fontsize': "medium"}, tight_layout=True, grid=grid))
+        else:
+            for isolver in range(2):
+                iters = rng.integers(5, 40, 500)
+                lines.append(line_spec('plot', None, iters, opts, isolver, solver_keys[isolver]))
+            specs.append(figure_spec(os.path.join(outdir, "case" + str(icase) + "-iters.png"), lines,
+                    "Matrix index in the batch", "Iterations", rcparams={'font.size': 14}))
+    return specs
+
+def get_max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def get_rss_mb():
+    ''' Current resident memory, or the peak where /proc is not available.
+    '''
+    try:
+        with open("/proc/self/statm", 'r') as infile:
+            return int(infile.read().split()[1])*os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError):
+        return get_max_rss_mb()
+
+def run_mode(mode, num_cases, outdir, num_checkpoints):
+    ''' Renders the synthetic cases in one mode. Returns the elapsed time and a
+    list of (cases rendered, resident MB, peak MB) at the checkpoints.
+    '''
+    specs = get_synthetic_specs(num_cases, outdir)
+    checkpoints = set(max(1, (num_cases*i) // num_checkpoints) for i in range(1, num_checkpoints+1))
+    memory = []
+    start = time.perf_counter()
+    if mode == 'fresh':
+        filenames = (render_figure(spec) for spec in specs)
+    else:
+        filenames = iter_render_with_templates(specs)
+    for irendered, filename in enumerate(filenames, 1):
+        if irendered in checkpoints:
+            memory.append((irendered, get_rss_mb(), get_max_rss_mb()))
+    return time.perf_counter() - start, memory
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark figure rendering with and without figure reuse")
+    parser.add_argument('--cases', type=int, default=2000, help = "Number of synthetic cases")
+    parser.add_argument('--checkpoints', type=int, default=8, help = "Number of memory measurements")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {}
+        for mode in ['fresh', 'template']:
+            outdir = os.path.join(tmpdir, mode)
+            os.makedirs(outdir)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results[mode] = executor.submit(run_mode, mode, args.cases, outdir,
+                        args.checkpoints).result()
+            elapsed, memory = results[mode]
+            print(mode + ": " + str(round(elapsed, 2)) + " s for " + str(args.cases) + " cases, "
+                    + str(round(1000*elapsed/args.cases, 1)) + " ms per figure")
+            for irendered, rss, max_rss in memory:
+                print("  after " + str(irendered) + " cases: " + str(round(rss)) + " MB resident, "
+                        + str(round(max_rss)) + " MB peak")
+        names = sorted(os.listdir(os.path.join(tmpdir, 'fresh')))
+        match, mismatch, errors = filecmp.cmpfiles(os.path.join(tmpdir, 'fresh'),
+                os.path.join(tmpdir, 'template'), names, shallow=False)
+        print("Speedup " + str(round(results['fresh'][0] / results['template'][0], 2))
+                + ", identical files: " + str(len(match)) + " of " + str(len(names)))
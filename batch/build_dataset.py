@@ -0,0 +1,154 @@
+#! /usr/bin/env python3
+
+'''
+Builds one long-format table of all benchmark results under a directory tree.
+
+The tree is listed through its manifest (manifest.py), and every solver run in
+every JSON file becomes one row with the columns in dataset_columns. String columns are categorical, so a
+row costs a few bytes of codes plus its numbers however long the names are.
+The table is written as Parquet if pandas has a Parquet engine, and otherwise
+as an .npz file of columns (codes and categories for the categorical ones).
+read_dataset reads either, and read_table also reads the per-case tables of
+create_table_from_json.py into the same columns.
+'''
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+from json_loader import load_file
+from arguments import add_tree_arguments, add_cache_argument
+from run_columns import categorical_columns, numeric_columns, dataset_columns, find_result_files, \
+        get_run_columns, get_file_processor
+
+# Columns of the tables written by create_table_from_json.py
+table_columns = {'processor': 'processor', 'case name': 'case', 'solver type': 'solver',
+        'matrix format': 'matrix_format', 'tolerance type': 'tolerance_type',
+        'batch size': 'batch_size', 'solve time (s)': 'apply_time'}
+
+class CategoryCodes:
+    ''' Collects one categorical column as integer codes while scanning.
+    '''
+    def __init__(self):
+        self.codes = {}
+        self.chunks = []
+
+    def append(self, values):
+        self.chunks.append(np.array([self.codes.setdefault(value, len(self.codes))
+                for value in values], dtype=np.int32))
+
+    def categorical(self):
+        codes = np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=list(self.codes))
+
+def build_dataset(rootdir, run_type, processor, processor_from_dir=False, tolerance_type='relative',
+        cache=None, recursive=True):
+    ''' Scans rootdir once, with its subdirectories if recursive, and returns the
+    long-format DataFrame of all runs.
+    '''
+    categories = {}
+    for column in categorical_columns:
+        categories[column] = CategoryCodes()
+    numbers = {}
+    for column in numeric_columns:
+        numbers[column] = []
+    for path in find_result_files(rootdir, recursive):
+        try:
+            record = load_file(os.path.join(rootdir, path), run_type, cache=cache)
+        except Exception as e:
+            print("Skipping " + path + ": " + str(e))
+            continue
+        filecolumns = get_run_columns(record, path,
+                get_file_processor(path, processor, processor_from_dir), tolerance_type)
+        for column in categorical_columns:
+            categories[column].append(filecolumns[column])
+        for column in numeric_columns:
+            numbers[column].append(filecolumns[column])
+    if cache is not None:
+        cache.save()
+    columns = {}
+    for column in categorical_columns:
+        columns[column] = categories[column].categorical()
+    for column in numeric_columns:
+        if len(numbers[column]) > 0:
+            columns[column] = np.concatenate(numbers[column]).astype(numeric_columns[column])
+        else:
+            columns[column] = np.zeros(0, dtype=numeric_columns[column])
+    return pd.DataFrame(columns)
+
+def has_parquet():
+    for engine in ['pyarrow', 'fastparquet']:
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            pass
+    return False
+
+def get_default_filename():
+    return "results.parquet" if has_parquet() else "results.npz"
+
+def save_dataset(df, filename):
+    if filename.endswith(".parquet"):
+        df.to_parquet(filename, index=False)
+        return
+    arrays = {}
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            arrays[column + ".codes"] = df[column].cat.codes.to_numpy()
+            arrays[column + ".categories"] = np.array(df[column].cat.categories, dtype=str)
+        else:
+            arrays[column] = df[column].to_numpy()
+    with open(filename, 'wb') as outfile:
+        np.savez_compressed(outfile, **arrays)
+
+def read_dataset(filename):
+    ''' Reads a table written by save_dataset.
+    '''
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(filename)
+    columns = {}
+    with np.load(filename, allow_pickle=False) as data:
+        for key in data.files:
+            if key.endswith(".categories"):
+                continue
+            if key.endswith(".codes"):
+                column = key[:-len(".codes")]
+                columns[column] = pd.Categorical.from_codes(data[key],
+                        categories=list(data[column + ".categories"]))
+            else:
+                columns[key] = data[key]
+    return pd.DataFrame({column: columns[column] for column in dataset_columns if column in columns})
+
+def read_table(filename):
+    ''' Reads a dataset, or a table written by create_table_from_json.py with its
+    columns renamed to those of the dataset.
+    '''
+    if filename.endswith(".parquet") or filename.endswith(".npz"):
+        return read_dataset(filename)
+    df = pd.read_csv(filename, sep=' ', keep_default_na=False, na_values={'solve time (s)': ['']})
+    df = df.rename(columns=table_columns)
+    for column in df.columns:
+        if column in categorical_columns:
+            df[column] = df[column].astype(str).astype('category')
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Collect all runs under a result directory into one table")
+    add_tree_arguments(parser)
+    parser.add_argument('--output', help = "Output file, .parquet or .npz")
+    add_cache_argument(parser)
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache:
+        from extract_cache import ExtractCache
+        cache = ExtractCache(args.dir)
+    df = build_dataset(args.dir, args.run_type, args.processor, args.processor_from_dir,
+            args.norm_type, cache)
+    outfilename = args.output if args.output is not None else get_default_filename()
+    save_dataset(df, outfilename)
+    print("Wrote " + str(len(df)) + " runs of " + str(len(df['case'].cat.categories)) + " cases to "
+            + outfilename + " (" + str(round(os.path.getsize(outfilename) / 1024, 1)) + " kB)")
@@ -0,0 +1,153 @@
+#! /usr/bin/env python3
+
+'''
+Compares two sets of benchmark results, e.g. of two solver builds, and reports
+the runs that became significantly slower or faster.
+
+Each set is a result directory, an SQLite store of result_store.py, or a
+dataset or table file. Runs are matched on run_stats.group_columns with one
+hash join of the two sets' per-group summaries. Repeated runs are compared with
+a Welch t-test on log times, so that a ratio of times is tested. With many
+groups, some would pass any fixed significance level by chance, so the p-values
+are adjusted for a false discovery rate of --alpha (Benjamini-Hochberg). Groups
+run only once on either side cannot be tested; with --single_runs they are
+judged on the ratio of times alone.
+
+A group is a regression if the new median time is more than --threshold slower
+and the difference is significant, and an improvement if it is that much
+faster. The script exits with status 1 if there is any regression, e.g.
+    compare_results.py nightly-old/ nightly-new/ --threshold 0.05 || echo "Slower"
+and with status 2 if no group of runs is found in both sets, since nothing was
+compared then.
+'''
+
+import os
+import sys
+import argparse
+import numpy as np
+from scipy import stats
+
+from run_stats import group_columns
+from build_dataset import build_dataset, read_table
+from arguments import add_tree_arguments
+
+def read_runs(source, run_type, processor, processor_from_dir=False, tolerance_type='relative'):
+    ''' The runs of a directory, a store or a dataset or table file, as a
+    DataFrame with the columns of build_dataset.py.
+    '''
+    if os.path.isdir(source):
+        return build_dataset(source, run_type, processor, processor_from_dir, tolerance_type)
+    if source.endswith(".sqlite"):
+        from result_store import ResultStore
+        store = ResultStore(source)
+        df = store.query_dataframe()
+        store.close()
+        return df
+    return read_table(source)
+
+def summarize_groups(df, column, keys):
+    ''' Number of runs, median time, and mean and variance of log times per group.
+    '''
+    df = df[keys + [column]].dropna(subset=[column])
+    df = df.assign(log_time=np.log(df[column].to_numpy(dtype=float)))
+    for key in keys:
+        # Both sets must use the same key types to be joined
+        df[key] = df[key].astype(np.int64 if key == 'batch_size' else str)
+    grouped = df.groupby(keys, sort=False)
+    summary = grouped[column].agg(['size', 'median'])
+    summary['log_mean'] = grouped['log_time'].mean()
+    summary['log_var'] = grouped['log_time'].var()
+    return summary.rename(columns={'size': 'runs'}).reset_index()
+
+def welch_test(mean1, var1, n1, mean2, var2, n2):
+    ''' Two-sided p-values of Welch's t-test for arrays of pairs of samples; NaN
+    where either side has fewer than two runs.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se1 = var1/n1
+        se2 = var2/n2
+        se = se1 + se2
+        t = (mean2 - mean1)/np.sqrt(se)
+        dof = se*se/(se1*se1/(n1 - 1) + se2*se2/(n2 - 1))
+        pvalues = 2*stats.t.sf(np.abs(t), dof)
+    # Identical repeats on both sides: no variance, significant if the means differ
+    pvalues = np.where(se == 0, np.where(mean1 == mean2, 1.0, 0.0), pvalues)
+    return np.where((n1 < 2) | (n2 < 2), np.nan, pvalues)
+
+def adjust_pvalues(pvalues):
+    ''' Benjamini-Hochberg adjusted p-values (q-values) of the p-values that are not NaN.
+    '''
+    qvalues = np.full(len(pvalues), np.nan)
+    tested = np.nonzero(~np.isnan(pvalues))[0]
+    if len(tested) == 0:
+        return qvalues
+    order = tested[np.argsort(pvalues[tested])]
+    ranked = pvalues[order]*len(tested)/np.arange(1, len(tested) + 1)
+    qvalues[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return qvalues
+
+def compare(old, new, column='apply_time', threshold=0.05, alpha=0.05, single_runs=False):
+    ''' Returns the matched groups with their ratio of median times (new/old),
+    p-value, adjusted p-value and status ('regression', 'improvement' or ''),
+    and the numbers of groups found in only the old or only the new set.
+    '''
+    keys = [key for key in group_columns if key in old.columns and key in new.columns]
+    oldsummary = summarize_groups(old, column, keys)
+    newsummary = summarize_groups(new, column, keys)
+    merged = oldsummary.merge(newsummary, on=keys, how='outer', suffixes=('_old', '_new'),
+            indicator=True)
+    only_old = int(np.sum(merged['_merge'] == 'left_only'))
+    only_new = int(np.sum(merged['_merge'] == 'right_only'))
+    merged = merged[merged['_merge'] == 'both'].drop(columns='_merge').reset_index(drop=True)
+    merged['runs_old'] = merged['runs_old'].astype(np.int64)
+    merged['runs_new'] = merged['runs_new'].astype(np.int64)
+    merged['ratio'] = merged['median_new']/merged['median_old']
+    merged['p_value'] = welch_test(merged['log_mean_old'].to_numpy(), merged['log_var_old'].to_numpy(),
+            merged['runs_old'].to_numpy(), merged['log_mean_new'].to_numpy(),
+            merged['log_var_new'].to_numpy(), merged['runs_new'].to_numpy())
+    merged['q_value'] = adjust_pvalues(merged['p_value'].to_numpy())
+    significant = merged['q_value'].to_numpy() < alpha
+    if single_runs:
+        significant |= np.isnan(merged['p_value'].to_numpy())
+    status = np.full(len(merged), '', dtype=object)
+    status[significant & (merged['ratio'] > 1.0 + threshold)] = 'regression'
+    status[significant & (merged['ratio'] < 1.0/(1.0 + threshold))] = 'improvement'
+    merged['status'] = status
+    merged = merged.drop(columns=['log_mean_old', 'log_var_old', 'log_mean_new', 'log_var_new'])
+    return merged, only_old, only_new
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Report runs that are significantly slower or faster in a new result set")
+    parser.add_argument('old', help = "Reference results: directory, .sqlite store, or dataset or table")
+    parser.add_argument('new', help = "Results to check, in any of the same forms")
+    add_tree_arguments(parser, directory=False)
+    parser.add_argument('--column', default = "apply_time", help = "Timing column")
+    parser.add_argument('--threshold', type=float, default=0.05,
+            help = "Smallest relative change of the median time reported")
+    parser.add_argument('--alpha', type=float, default=0.05,
+            help = "False discovery rate of the significance tests")
+    parser.add_argument('--single_runs', action="store_true",
+            help = "Also report groups run only once on either side, on their ratio alone")
+    parser.add_argument('--output', help = "Write the comparison of all matched groups to this table")
+    args = parser.parse_args()
+
+    old = read_runs(args.old, args.run_type, args.processor, args.processor_from_dir, args.norm_type)
+    new = read_runs(args.new, args.run_type, args.processor, args.processor_from_dir, args.norm_type)
+    result, only_old, only_new = compare(old, new, args.column, args.threshold, args.alpha,
+            args.single_runs)
+    print("Matched " + str(len(result)) + " groups of runs; " + str(only_old) + " only in "
+            + args.old + ", " + str(only_new) + " only in " + args.new)
+    if args.output is not None:
+        result.to_csv(args.output, sep=' ', index=False)
+    if len(result) == 0:
+        print("No groups of runs match between " + args.old + " and " + args.new
+                + "; nothing was compared")
+        sys.exit(2)
+    changed = result[result['status'] != ''].sort_values('ratio', ascending=False)
+    if len(changed) > 0:
+        print(changed.to_string(index=False))
+    nregressions = int(np.sum(changed['status'] == 'regression'))
+    print(str(nregressions) + " regressions, " + str(len(changed) - nregressions) + " improvements"
+            + " above " + str(round(100*args.threshold, 2)) + "%")
+    sys.exit(1 if nregressions > 0 else 0)
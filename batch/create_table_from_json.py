@@ -9,52 +9,67 @@ We assume:
 '''
 
 import os
-import json
-import re
+import csv
 import argparse
 import numpy as np
-import pandas as pd
 #from matplotlib import pyplot as plt
 
-from utils import sort_multiple
+from utils import co_sort
+from json_loader import load_file, find_json_files
 
 def get_data_from_file(filename, batch_mult):
     """ Assumes only one one solver dataset per file.
     """
+    record = load_file(filename, 'batch_solver')
     batch_size = 0
     times = []
     solver_names = []
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    for key in db[0]['batch_solver']:
-        solver_names.append(key)
-        batch_size = int(db[0]['batch_solver'][key]['num_batch_entries'])
-        #totalapplytime = db[0]['batch_solver'][key]['apply']['time']
-        applyre = re.compile(r'apply')
-        apply_kernel_time_found = False
-        for subkey in db[0]['batch_solver'][key]['apply']['components']:
-            if re.search(applyre, subkey):
-                apply_kernel_time_found = True
-                times.append(db[0]['batch_solver'][key]['apply']['components'][subkey])
-                break
-        assert(apply_kernel_time_found)
+    for isolver in range(len(record['solver_keys'])):
+        solver_names.append(record['solver_keys'][isolver])
+        batch_size = int(record['batch_sizes'][isolver])
+        assert(not np.isnan(record['apply_kernel_times'][isolver]))
+        times.append(record['apply_kernel_times'][isolver])
     return batch_size, times, solver_names
 
+table_header = ["processor", "case name", "solver type", "matrix format", "tolerance type",
+        "batch size", "solve time (s)"]
+
+def write_table(filename, rows):
+    # Written with the csv module rather than pandas, which takes longer to import
+    # than the rest of this script takes to run
+    with open(filename, 'w', newline='') as outfile:
+        writer = csv.writer(outfile, delimiter=' ', quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+        writer.writerow(table_header)
+        writer.writerows(rows)
+
 def output_per_case(batch_sizes, data, case_name, solver_name, norm_type, matrix_format,
         backend):
     assert(len(batch_sizes) == len(data))
-    bsizes = np.array(batch_sizes, dtype=int)
-    timesm = np.zeros((len(data),1))
-    timesm[:,0] = data[:]
-    sort_multiple(bsizes, timesm)
-    times = timesm[:,0]
-    df = pd.DataFrame({ "processor":backend, "case name": case_name, "solver type": solver_name, 
-        "matrix format": matrix_format, "tolerance type": norm_type,
-        "batch size": bsizes, "solve time (s)": times})
-    df.to_csv(case_name + ".txt", sep=' ', index=False)
+    bsizes, times = co_sort(np.array(batch_sizes, dtype=int), np.array(data, dtype=float))
+    rows = [[backend, case_name, solver_name, matrix_format, norm_type, bsize, time]
+            for bsize, time in zip(bsizes.tolist(), times.tolist())]
+    write_table(case_name + ".txt", rows)
     return
 
+def output_from_dataset(filename, matrix_format):
+    """ Writes one table per case of a dataset from build_dataset.py, with the
+    processor, solver, format and tolerance type of each run.
+    """
+    # Reading the dataset needs pandas
+    from build_dataset import read_dataset
+    df = read_dataset(filename)
+    if matrix_format is not None:
+        df = df[df['matrix_format'] == matrix_format]
+    for case_name, casedf in df.groupby('case', observed=True, sort=False):
+        casedf = casedf.sort_values(['processor', 'solver', 'matrix_format', 'batch_size'],
+                kind='stable')
+        rows = [list(row) for row in zip(casedf['processor'].astype(str), casedf['case'].astype(str),
+                casedf['solver'].astype(str), casedf['matrix_format'].astype(str),
+                casedf['tolerance_type'].astype(str), casedf['batch_size'].tolist(),
+                casedf['apply_time'].tolist())]
+        print("Case " + case_name + " with " + str(len(rows)) + " runs")
+        write_table(case_name + ".txt", rows)
+
 if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(
@@ -62,8 +77,14 @@ if __name__ == "__main__":
     parser.add_argument('--norm_type', default = "relative", help = "\'absolute\' or \'relative\' norm")
     parser.add_argument('--matrix_format', help = "matrix format name")
     parser.add_argument('--processor', default='CPU', help = "Processor on which runs were performed")
+    parser.add_argument('--dataset', help = "Write the tables from this file of build_dataset.py"
+            + " instead of the JSON files in the current directory")
     args = parser.parse_args()
 
+    if args.dataset is not None:
+        output_from_dataset(args.dataset, args.matrix_format)
+        exit()
+
     print("Processor = ", args.processor)
 
     curdir = os.getcwd()
@@ -74,25 +95,24 @@ if __name__ == "__main__":
     solver_name = ""
     case_name = ""
     
-    for filen in os.listdir(curdir):
-        if filen.endswith("json"):
-            fsplit = filen.split('.')[0].split('-')
-            batch_mult = int(fsplit[-1])
-            case_name = fsplit[0]
-            print("Case " + case_name + " with batch multiplier " + str(batch_mult))
-
-            batch_size = 0
-            times = []
-            if "block" in filen:
-                #batch_size, times = get_data_from_block_file(dirpath + os.sep + filen, batch_mult)
-                #assert(len(times) == 1)
-                throw("Block output file not yet supported!")
-            else:
-                batch_size, times, solver_names = get_data_from_file(curdir + os.sep + filen, batch_mult)
-                assert(len(times) == 1)
-            batch_sizes.append(batch_size)
-            data.append(times[0])
-            solver_name = solver_names[0]
+    for filen in find_json_files(curdir):
+        fsplit = filen.split('.')[0].split('-')
+        batch_mult = int(fsplit[-1])
+        case_name = fsplit[0]
+        print("Case " + case_name + " with batch multiplier " + str(batch_mult))
+
+        batch_size = 0
+        times = []
+        if "block" in filen:
+            #batch_size, times = get_data_from_block_file(dirpath + os.sep + filen, batch_mult)
+            #assert(len(times) == 1)
+            throw("Block output file not yet supported!")
+        else:
+            batch_size, times, solver_names = get_data_from_file(curdir + os.sep + filen, batch_mult)
+            assert(len(times) == 1)
+        batch_sizes.append(batch_size)
+        data.append(times[0])
+        solver_name = solver_names[0]
 
     output_per_case(batch_sizes, data, case_name, solver_name, args.norm_type, args.matrix_format,
             args.processor)
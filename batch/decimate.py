@@ -0,0 +1,45 @@
+'''
+Min-max decimation of per-entry series for plotting.
+
+A figure cannot show more than one value per pixel column, so a series of a
+million batch entries is cut into buckets of consecutive entries, and only the
+smallest and largest value of each bucket are kept, in index order. The
+envelope of the series, and so every outlier, is drawn exactly as with all
+points, while the number of points drawn no longer grows with the batch size.
+All series of a figure, one per solver, are decimated at once.
+'''
+
+import numpy as np
+
+# Two points per pixel column of a default figure, 6.4 in wide at 200 dpi
+default_max_points = 2*int(6.4*200)
+
+def get_bucket_extrema(buckets):
+    ''' Indices of the minimum and the maximum within each bucket of a
+    (series, buckets, bucket size) array, the smaller index first.
+    '''
+    imin = np.argmin(buckets, axis=2)
+    imax = np.argmax(buckets, axis=2)
+    return np.stack((np.minimum(imin, imax), np.maximum(imin, imax)), axis=2)
+
+def decimate(values, max_points=default_max_points):
+    ''' Reduces each row of a (series, entries) array to at most about max_points
+    points, keeping the minimum and maximum of each bucket of entries. Returns
+    the kept entry indices and values, both (series, points) arrays, or None and
+    the values unchanged if there are no more than max_points entries.
+    '''
+    nseries, nentries = values.shape
+    if nentries <= max_points:
+        return None, values
+    nbuckets = max(1, max_points//2)
+    size = -(-nentries//nbuckets)
+    nfull = nentries//size
+    # Whole buckets are a view of the values; only the last, partial one is separate
+    full = values[:, :nfull*size].reshape(nseries, nfull, size)
+    indices = get_bucket_extrema(full) + (size*np.arange(nfull))[None, :, None]
+    indices = indices.reshape(nseries, 2*nfull)
+    if nfull*size < nentries:
+        tail = values[:, nfull*size:]
+        tailindices = get_bucket_extrema(tail[:, None, :])[:, 0, :] + nfull*size
+        indices = np.concatenate((indices, tailindices), axis=1)
+    return indices, np.take_along_axis(values, indices, axis=1)
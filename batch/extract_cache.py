@@ -0,0 +1,205 @@
+#! /usr/bin/env python3
+
+'''
+On-disk cache of the records extracted from benchmark JSON files.
+
+The cache lives in a sidecar directory (.extract_cache by default) next to the
+JSON files. Each record is stored once per content hash and run type as an
+uncompressed .npz file. An index maps each source file name to its size, mtime
+and content hash, so an unchanged file is recognised from a single stat call.
+A file whose mtime changed is re-hashed, and its cached record is reused if the
+content is the same. The least recently used records are evicted when the
+cache grows beyond its size limit.
+
+Run this file directly to inspect, trim or clear a cache.
+'''
+
+import os
+import json
+import time
+import hashlib
+import argparse
+
+cache_dirname = ".extract_cache"
+index_filename = "index.json"
+default_max_bytes = 1 << 30
+# Part of every record's name; bump it whenever records gain or change fields
+record_version = 2
+
+def hash_file(filename):
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as infile:
+        while True:
+            chunk = infile.read(1 << 20)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def save_record(record, filename):
+    ''' Writes a record from json_loader to an .npz file.
+    '''
+    meta = {'run_type': record['run_type'], 'problem': record['problem'],
+            'solver_keys': record['solver_keys'], 'matrix_formats': record['matrix_formats']}
+    import numpy as np
+    arrays = {'meta': np.array(json.dumps(meta))}
+    for key in record:
+        if key not in meta and record[key] is not None:
+            arrays[key] = record[key]
+    tmpname = filename + ".tmp"
+    with open(tmpname, 'wb') as outfile:
+        np.savez(outfile, **arrays)
+    os.replace(tmpname, filename)
+
+def read_record(filename):
+    ''' Reads a record written by save_record. Per-entry arrays that were not
+    stored come back as None.
+    '''
+    record = {}
+    import numpy as np
+    with np.load(filename, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        record.update(meta)
+        for key in data.files:
+            if key != 'meta':
+                record[key] = data[key]
+    for key in ['num_iters', 'residual_norm', 'rhs_norm']:
+        if key not in record:
+            record[key] = None
+    return record
+
+class ExtractCache:
+    ''' Cache of extracted records for the JSON files in one directory.
+    '''
+    def __init__(self, directory, max_bytes=default_max_bytes):
+        self.directory = directory
+        self.cachedir = os.path.join(directory, cache_dirname)
+        self.max_bytes = max_bytes
+        self.index = {'files': {}, 'entries': {}}
+        self.hits = 0
+        self.misses = 0
+        indexpath = os.path.join(self.cachedir, index_filename)
+        if os.path.isfile(indexpath):
+            with open(indexpath, 'r') as infile:
+                self.index = json.load(infile)
+
+    def entry_name(self, filehash, run_type):
+        return filehash + "-" + str(run_type) + "-v" + str(record_version) + ".npz"
+
+    def get_name(self, filename):
+        ''' Files are known by their path relative to the cache's directory, so that
+        one cache can serve a whole tree of result directories.
+        '''
+        return os.path.relpath(os.path.abspath(filename), os.path.abspath(self.directory))
+
+    def get_hash(self, filename):
+        ''' Returns the content hash of a file, re-hashing only if its size or mtime
+        differs from what the index recorded.
+        '''
+        st = os.stat(filename)
+        name = self.get_name(filename)
+        known = self.index['files'].get(name)
+        if known is not None and known['size'] == st.st_size and known['mtime'] == st.st_mtime_ns:
+            return known['hash']
+        filehash = hash_file(filename)
+        self.index['files'][name] = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': filehash}
+        return filehash
+
+    def get(self, filename, run_type):
+        ''' Returns the cached record for a file, or None.
+        '''
+        entry = self.entry_name(self.get_hash(filename), run_type)
+        if entry not in self.index['entries']:
+            self.misses += 1
+            return None
+        entrypath = os.path.join(self.cachedir, entry)
+        if not os.path.isfile(entrypath):
+            del self.index['entries'][entry]
+            self.misses += 1
+            return None
+        self.index['entries'][entry]['used'] = time.time()
+        self.hits += 1
+        return read_record(entrypath)
+
+    def put(self, filename, run_type, record):
+        os.makedirs(self.cachedir, exist_ok=True)
+        entry = self.entry_name(self.get_hash(filename), run_type)
+        entrypath = os.path.join(self.cachedir, entry)
+        save_record(record, entrypath)
+        self.index['entries'][entry] = {'size': os.path.getsize(entrypath), 'used': time.time()}
+
+    def total_bytes(self):
+        return sum(self.index['entries'][entry]['size'] for entry in self.index['entries'])
+
+    def evict(self):
+        ''' Removes least recently used records until the cache fits its size limit.
+        '''
+        total = self.total_bytes()
+        by_use = sorted(self.index['entries'], key=lambda entry: self.index['entries'][entry]['used'])
+        for entry in by_use:
+            if total <= self.max_bytes:
+                break
+            total -= self.index['entries'][entry]['size']
+            del self.index['entries'][entry]
+            entrypath = os.path.join(self.cachedir, entry)
+            if os.path.isfile(entrypath):
+                os.remove(entrypath)
+
+    def save(self):
+        ''' Evicts if needed and writes the index. Call once after loading.
+        '''
+        if not os.path.isdir(self.cachedir):
+            return
+        self.evict()
+        indexpath = os.path.join(self.cachedir, index_filename)
+        with open(indexpath + ".tmp", 'w') as outfile:
+            json.dump(self.index, outfile)
+        os.replace(indexpath + ".tmp", indexpath)
+
+    def invalidate(self, filenames):
+        ''' Drops the cached records of the given source files.
+        '''
+        for filename in filenames:
+            name = self.get_name(filename)
+            known = self.index['files'].pop(name, None)
+            if known is None:
+                continue
+            for entry in list(self.index['entries']):
+                if entry.startswith(known['hash'] + "-"):
+                    del self.index['entries'][entry]
+                    entrypath = os.path.join(self.cachedir, entry)
+                    if os.path.isfile(entrypath):
+                        os.remove(entrypath)
+
+    def clear(self):
+        if not os.path.isdir(self.cachedir):
+            return
+        for name in os.listdir(self.cachedir):
+            os.remove(os.path.join(self.cachedir, name))
+        os.rmdir(self.cachedir)
+        self.index = {'files': {}, 'entries': {}}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description = "Inspect or invalidate the extraction cache of a result directory")
+    parser.add_argument('--dir', default = os.getcwd(), help = "Result directory holding the cache")
+    parser.add_argument('--clear', help = "Delete the whole cache", action="store_true")
+    parser.add_argument('--invalidate', nargs='+', default = [],
+            help = "Drop the cached records of these JSON files")
+    parser.add_argument('--max_mb', type=float, help = "Evict records until the cache is below this size")
+    args = parser.parse_args()
+
+    cache = ExtractCache(args.dir)
+    if args.clear:
+        cache.clear()
+        print("Cleared " + cache.cachedir)
+        exit()
+    if len(args.invalidate) > 0:
+        cache.invalidate(args.invalidate)
+    if args.max_mb is not None:
+        cache.max_bytes = int(args.max_mb * (1 << 20))
+    cache.save()
+    print("Cache " + cache.cachedir + ": " + str(len(cache.index['entries'])) + " records, "
+            + str(round(cache.total_bytes() / (1 << 20), 2)) + " MB, "
+            + str(len(cache.index['files'])) + " source files")
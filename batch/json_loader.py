@@ -0,0 +1,235 @@
+'''
+Shared reader for Ginkgo benchmark JSON output.
+
+Every benchmark file is parsed exactly once and reduced to a small record that
+holds everything the scripts in this directory need: solver keys, matrix
+formats, batch sizes, apply times and, for detailed output, the per-entry
+iteration counts and norms. The JSON document itself is dropped as soon as the
+record is built.
+
+Files may be compressed (.json.gz, .json.xz, .json.bz2). They are decompressed
+while being read and always parsed incrementally with json_stream, so neither
+the decompressed text nor the per-entry dicts are ever held in memory whole.
+Files processed with remove_detailed_data_from_json.py --format npz are read
+too, with their per-entry data as arrays.
+
+NumPy and json_stream are only imported by the functions that use them, so
+that scripts which merely find or strip files start quickly.
+'''
+
+import re
+import bz2
+import gzip
+import json
+import lzma
+
+from manifest import get_manifest, get_compression
+
+applyre = re.compile(r'apply')
+
+# Detailed output has one dict per solver for each of these, keyed by str(i)
+per_entry_keys = ['num_iters', 'residual_norm', 'rhs_norm']
+
+# Keys under which the problem section may give the size of each matrix in the batch
+problem_size_keys = {'rows': ['rows', 'num_rows'], 'nonzeros': ['nonzeros', 'num_nonzeros', 'nnz']}
+
+# Module opening each kind of compressed file
+decompressors = {'.gz': gzip, '.xz': lzma, '.bz2': bz2}
+
+def find_json_files(curdir, prefer='processed'):
+    ''' Returns the names of the benchmark files in the given directory, sorted,
+    from the directory's manifest: raw JSON, plain or compressed, or output of
+    remove_detailed_data_from_json.py. Where a run has both, only the preferred
+    kind is returned ('processed' or 'raw').
+    '''
+    return get_manifest(curdir).select_results(recursive=False, prefer=prefer)
+
+def open_text(filename, mode='r'):
+    ''' Opens a file for reading or writing text, compressed or decompressed on
+    the fly according to its suffix.
+    '''
+    compression = get_compression(filename)
+    if compression == '':
+        return open(filename, mode)
+    return decompressors[compression].open(filename, mode + 't')
+
+def read_npz(filename):
+    ''' Reads a file written by remove_detailed_data_from_json.py --format npz
+    back into its document, with per-entry arrays in place of per-entry dicts.
+    '''
+    import numpy as np
+    with np.load(filename, allow_pickle=False) as data:
+        db = json.loads(str(data['meta']))
+        section = get_run_section(db, str(data['run_type']))
+        solver_keys = [key for key in section]
+        for name in data.files:
+            entkey, _, isolver = name.rpartition('_')
+            if entkey in per_entry_keys:
+                section[solver_keys[int(isolver)]][entkey] = data[name]
+    return db
+
+def read_json(filename, stream=False):
+    ''' Parses a benchmark file. With stream=True, the file is read incrementally and
+    per-entry dicts come back as NumPy arrays; see json_stream. Compressed files
+    are always read this way, and .npz files come back likewise.
+    '''
+    if filename.endswith(".npz"):
+        return read_npz(filename)
+    stream = stream or get_compression(filename) != ''
+    with open_text(filename) as infile:
+        if stream:
+            import json_stream
+            return json_stream.load(infile)
+        return json.load(infile)
+
+def get_run_section(db, run_type):
+    ''' Returns the dict of runs (solvers, formats etc.) of the given run type.
+    A run type of None means the runs are at the top level, as in old processed files.
+    '''
+    if run_type is None:
+        return db[0]
+    if run_type not in db[0]:
+        raise Exception("Could not find key " + run_type + "!")
+    return db[0][run_type]
+
+def get_problem_size(db, run_type):
+    ''' Returns {'rows': ..., 'nonzeros': ...} from the problem section of a file,
+    with None for what it does not give. Old files without run types have no
+    problem section.
+    '''
+    problem = {}
+    if run_type is not None and isinstance(db[0].get('problem'), dict):
+        problem = db[0]['problem']
+    size = {}
+    for key in problem_size_keys:
+        size[key] = None
+        for altkey in problem_size_keys[key]:
+            if altkey in problem:
+                size[key] = int(problem[altkey])
+                break
+    return size
+
+def get_apply_kernel_time(solverdb):
+    ''' Returns the first apply component time, or None if there is none.
+    '''
+    if 'apply' not in solverdb or 'components' not in solverdb['apply']:
+        return None
+    for subkey in solverdb['apply']['components']:
+        if re.search(applyre, subkey):
+            return solverdb['apply']['components'][subkey]
+    return None
+
+def get_per_entry_values(entrydict, dtype):
+    ''' Converts a per-entry dict {"0": [v0, ...], "1": [v1, ...], ...} to an array of
+    the first values, indexed by entry, in one bulk pass over the dict.
+    '''
+    import numpy as np
+    if isinstance(entrydict, np.ndarray):
+        return entrydict.astype(dtype, copy=False)
+    batch_size = len(entrydict)
+    indices = np.fromiter(map(int, entrydict.keys()), dtype=np.int64, count=batch_size)
+    entries = np.fromiter((entry[0] for entry in entrydict.values()), dtype=np.float64,
+            count=batch_size)
+    values = np.empty(batch_size, dtype=dtype)
+    values[indices] = entries
+    return values
+
+def stack_per_entry(arrays, dtype):
+    ''' Stacks per-solver arrays into one (n_solvers, batch_size) array, or returns None
+    if any solver lacks the quantity or the batch sizes differ.
+    '''
+    import numpy as np
+    if len(arrays) == 0 or any(arr is None for arr in arrays):
+        return None
+    if any(len(arr) != len(arrays[0]) for arr in arrays):
+        return None
+    return np.ascontiguousarray(np.stack(arrays), dtype=dtype)
+
+def extract_record(db, run_type):
+    ''' Reduces a parsed benchmark file to the quantities used for plotting.
+    Scalar quantities are arrays indexed like solver_keys; missing times are NaN.
+    Per-entry quantities are arrays of shape (n_solvers, batch_size), or None if
+    not every solver has them. 'problem' holds the matrix size, see get_problem_size.
+    '''
+    import numpy as np
+    from json_stream import per_entry_dtypes
+    section = get_run_section(db, run_type)
+    solver_keys = [key for key in section]
+    nsolvers = len(solver_keys)
+    record = {}
+    record['run_type'] = run_type
+    record['problem'] = get_problem_size(db, run_type)
+    record['solver_keys'] = solver_keys
+    record['matrix_formats'] = ['' for i in range(nsolvers)]
+    record['batch_sizes'] = np.zeros(nsolvers, dtype=int)
+    record['apply_times'] = np.full(nsolvers, np.nan)
+    record['apply_kernel_times'] = np.full(nsolvers, np.nan)
+    record['times'] = np.full(nsolvers, np.nan)
+    per_entry = {}
+    for entkey in per_entry_keys:
+        per_entry[entkey] = [None for i in range(nsolvers)]
+
+    for i in range(nsolvers):
+        solverdb = section[solver_keys[i]]
+        if 'matrix_format' in solverdb:
+            record['matrix_formats'][i] = solverdb['matrix_format']
+        if 'apply' in solverdb and 'time' in solverdb['apply']:
+            record['apply_times'][i] = solverdb['apply']['time']
+        kernel_time = get_apply_kernel_time(solverdb)
+        if kernel_time is not None:
+            record['apply_kernel_times'][i] = kernel_time
+        if 'time' in solverdb:
+            record['times'][i] = solverdb['time']
+        batch_size = 0
+        for entkey in per_entry_keys:
+            if entkey in solverdb:
+                per_entry[entkey][i] = get_per_entry_values(solverdb[entkey],
+                        per_entry_dtypes[entkey])
+                batch_size = len(per_entry[entkey][i])
+        if 'num_batch_entries' in solverdb:
+            batch_size = int(solverdb['num_batch_entries'])
+        record['batch_sizes'][i] = batch_size
+    for entkey in per_entry_keys:
+        record[entkey] = stack_per_entry(per_entry[entkey], per_entry_dtypes[entkey])
+    return record
+
+def load_file(filename, run_type, stream=False, cache=None):
+    ''' Parses one benchmark file and returns its record.
+    If an ExtractCache is given, an unchanged file is not parsed again.
+    '''
+    if cache is not None:
+        record = cache.get(filename, run_type)
+        if record is not None:
+            return record
+    record = extract_record(read_json(filename, stream), run_type)
+    if cache is not None:
+        cache.put(filename, run_type, record)
+    return record
+
+def load_files(filenames, run_type, stream=False, cache=None):
+    ''' Returns a dict of records keyed by file name, in the order given.
+    '''
+    records = {}
+    for filename in filenames:
+        records[filename] = load_file(filename, run_type, stream, cache)
+    if cache is not None:
+        cache.save()
+        print("Extraction cache: " + str(cache.hits) + " hits, " + str(cache.misses) + " misses")
+    return records
+
+def get_solver_index(record, solver_key):
+    return record['solver_keys'].index(solver_key)
+
+def get_per_entry_arrays(record, solver_keys):
+    ''' Returns a dict with contiguous (len(solver_keys), batch_size) arrays of
+    num_iters (int32), residual_norm and rhs_norm (float64), rows ordered like
+    solver_keys. Quantities missing from the record are None.
+    '''
+    rows = [get_solver_index(record, key) for key in solver_keys]
+    arrays = {}
+    for entkey in per_entry_keys:
+        if record[entkey] is None:
+            arrays[entkey] = None
+        else:
+            arrays[entkey] = record[entkey][rows]
+    return arrays
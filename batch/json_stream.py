@@ -0,0 +1,168 @@
+'''
+Incremental reader for detailed Ginkgo batch-solver JSON output.
+
+The file is read in fixed-size chunks. Everything except the per-entry dicts
+(num_iters, residual_norm, rhs_norm) is built into the usual nested dicts and
+lists, which are small. The per-entry dicts, which hold one small list per
+batch entry, are never built; their first values are written straight into
+preallocated NumPy arrays instead. Peak memory is therefore bounded by the
+output arrays plus one chunk of text, not by the size of the document.
+'''
+
+import re
+import json
+import numpy as np
+
+chunk_size = 1 << 20
+
+# Tokens are only accepted this far from the end of the buffer, so that numbers
+# cut by a chunk boundary (e.g. "0." or "1e") are never taken as complete
+token_margin = 64
+
+per_entry_dtypes = {'num_iters': np.int32, 'residual_norm': np.float64, 'rhs_norm': np.float64}
+
+token_re = re.compile(r'\s*(?:(?P<punct>[{}\[\]:,])|(?P<string>"(?:[^"\\]|\\.)*")'
+        r'|(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+        r'|(?P<literal>true|false|null|NaN|-?Infinity))')
+
+# One '"<index>": [<value>, ...]' item of a per-entry dict; only the first value is kept
+entry_re = re.compile(r'"(\d+)"\s*:\s*\[\s*([^,\]\s]+)')
+
+literals = {'true': True, 'false': False, 'null': None, 'NaN': float('nan'),
+        'Infinity': float('inf'), '-Infinity': float('-inf')}
+
+class ChunkReader:
+    ''' Tokenizer over a text file object that holds at most about one chunk in memory.
+    '''
+    def __init__(self, infile):
+        self.infile = infile
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def refill(self):
+        chunk = self.infile.read(chunk_size)
+        if chunk == '':
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def next_token(self):
+        while True:
+            m = token_re.match(self.buf, self.pos)
+            if m is not None and (m.end() + token_margin <= len(self.buf) or self.eof):
+                self.pos = m.end()
+                return m.lastgroup, m.group(m.lastgroup)
+            if self.eof:
+                raise ValueError("Malformed JSON near: " + self.buf[self.pos:self.pos+40])
+            self.refill()
+
+    def peek_char(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos+1]
+            self.refill()
+
+    def expect(self, punct):
+        kind, value = self.next_token()
+        if kind != 'punct' or value != punct:
+            raise ValueError("Expected '" + punct + "' but found " + value)
+
+    def read_per_entry_dict(self, dtype, size_hint):
+        ''' Reads a dict of the form {"0": [v0], "1": [v1], ...} into an array.
+        The array is preallocated to size_hint entries and grown only if needed.
+        '''
+        self.expect('{')
+        values = np.zeros(max(size_hint, 1), dtype=dtype)
+        length = 0
+        while True:
+            # Per-entry items contain no braces, so the first '}' closes the dict
+            end = self.buf.find('}', self.pos)
+            done = end >= 0
+            if done:
+                region_end = end
+            else:
+                region_end = self.buf.rfind(']', self.pos) + 1
+            if region_end > self.pos:
+                pairs = entry_re.findall(self.buf, self.pos, region_end)
+                if len(pairs) > 0:
+                    indices = np.array([pair[0] for pair in pairs]).astype(np.int64)
+                    entries = np.array([pair[1] for pair in pairs]).astype(np.float64)
+                    maxidx = int(indices.max())
+                    if maxidx >= len(values):
+                        grown = np.zeros(max(2*len(values), maxidx+1), dtype=dtype)
+                        grown[:length] = values[:length]
+                        values = grown
+                    values[indices] = entries
+                    length = max(length, maxidx+1)
+                self.pos = region_end
+            if done:
+                self.pos = end + 1
+                break
+            if self.eof:
+                raise ValueError("Unterminated per-entry dict")
+            self.refill()
+        if length < len(values):
+            values = values[:length].copy()
+        return values
+
+def parse_value(reader, token):
+    kind, value = token
+    if kind == 'string':
+        if '\\' in value:
+            return json.loads(value)
+        return value[1:-1]
+    if kind == 'number':
+        if '.' in value or 'e' in value or 'E' in value:
+            return float(value)
+        return int(value)
+    if kind == 'literal':
+        return literals[value]
+    if value == '[':
+        arr = []
+        token = reader.next_token()
+        if token == ('punct', ']'):
+            return arr
+        while True:
+            arr.append(parse_value(reader, token))
+            kind, value = reader.next_token()
+            if value == ']':
+                return arr
+            if value != ',':
+                raise ValueError("Expected ',' or ']' but found " + value)
+            token = reader.next_token()
+    if value == '{':
+        obj = {}
+        size_hint = 0
+        token = reader.next_token()
+        if token == ('punct', '}'):
+            return obj
+        while True:
+            if token[0] != 'string':
+                raise ValueError("Expected a key but found " + token[1])
+            key = parse_value(reader, token)
+            reader.expect(':')
+            if key in per_entry_dtypes and reader.peek_char() == '{':
+                if 'num_batch_entries' in obj:
+                    size_hint = int(obj['num_batch_entries'])
+                obj[key] = reader.read_per_entry_dict(per_entry_dtypes[key], size_hint)
+                # Sibling per-entry dicts of a solver have the same length
+                size_hint = len(obj[key])
+            else:
+                obj[key] = parse_value(reader, reader.next_token())
+            kind, value = reader.next_token()
+            if value == '}':
+                return obj
+            if value != ',':
+                raise ValueError("Expected ',' or '}' but found " + value)
+            token = reader.next_token()
+    raise ValueError("Unexpected token " + value)
+
+def load(infile):
+    ''' Parses a benchmark file object like json.load, except that per-entry dicts
+    are returned as NumPy arrays indexed by batch entry.
+    '''
+    reader = ChunkReader(infile)
+    return parse_value(reader, reader.next_token())
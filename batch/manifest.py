@@ -0,0 +1,269 @@
+#! /usr/bin/env python3
+
+'''
+Index of all files in a result tree, kept in a manifest file at its root.
+
+The manifest records every directory's mtime and, for each file, its size and
+mtime and the metadata read from its path: case and batch multiplier from the
+file name, processor from the first directory level, whether it is raw
+benchmark output or processed by remove_detailed_data_from_json.py, and its
+compression (see compression_suffixes). When the tree is listed again, a
+directory whose mtime is unchanged has the same entries, so it costs one stat
+call instead of a listing and a stat call per file. Only
+directories in which files were added, removed or renamed are listed again.
+Files rewritten in place do not change their directory's mtime; --verify
+re-lists everything.
+
+As with git's index, an unchanged mtime only proves that a directory is
+unchanged if it is clearly older than the listing: a file added within the same
+mtime tick as the listing, or a listing served from a stale network filesystem
+cache, leaves the mtime as stored. The time of each listing is therefore
+recorded, and a directory modified less than racy_margin_ns before it is listed
+again on every update until its mtime is old enough.
+
+Scripts select their input files with Manifest.select, by glob pattern and
+metadata, e.g. the raw files of one case on one processor:
+    get_manifest(rootdir).select("*.json", case="gri30", processor="skylake")
+Manifest.select_results selects benchmark files with one file per run: a raw
+file and the files processed from it are one run.
+Run this file directly to update a manifest and list a selection.
+'''
+
+import os
+import re
+import json
+import time
+import fnmatch
+import argparse
+
+manifest_filename = ".result_manifest"
+# Bump whenever the stored metadata changes
+manifest_version = 4
+
+# Directories modified this close to their listing are listed again; covers coarse
+# mtimes and the clock skew and attribute caching of network filesystems
+racy_margin_ns = 5*10**9
+
+# Suffixes of compressed files, which are otherwise treated like the file without them
+compression_suffixes = ['.gz', '.xz', '.bz2']
+
+# Raw benchmark output, plain or compressed
+json_patterns = ["*.json" + suffix for suffix in [''] + compression_suffixes]
+# Output of remove_detailed_data_from_json.py
+processed_patterns = ["*.json.processed" + suffix for suffix in [''] + compression_suffixes] \
+        + ["*.processed.npz"]
+
+# Files of one case at several batch sizes are named <case>_b<multiplier>.json or <case>-<multiplier>.json
+filenamere = re.compile(r'^(.+?)(?:_b|-)(\d+)$')
+
+# Manifests already loaded and updated by this process, by absolute root directory
+manifests = {}
+
+def get_case_and_multiplier(filename):
+    ''' Returns the case name and batch multiplier in a file name; the multiplier
+    is 0 if the name has none.
+    '''
+    stem = os.path.basename(filename).split('.')[0]
+    match = filenamere.match(stem)
+    if match is None:
+        return stem, 0
+    return match.group(1), int(match.group(2))
+
+def get_compression(filename):
+    ''' The compression suffix of a file name, or '' if it is not compressed.
+    '''
+    for suffix in compression_suffixes:
+        if filename.endswith(suffix):
+            return suffix
+    return ''
+
+def get_raw_name(relpath):
+    ''' The path of the raw file from which a file was processed, or of the file
+    itself if it is raw, without its compression suffix.
+    '''
+    relpath = relpath[:len(relpath)-len(get_compression(relpath))]
+    for suffix in [".processed.npz", ".processed"]:
+        if relpath.endswith(suffix):
+            return relpath[:-len(suffix)]
+    return relpath
+
+def get_file_metadata(relpath, size, mtime):
+    casename, batch_mult = get_case_and_multiplier(relpath)
+    parts = relpath.split(os.sep)
+    compression = get_compression(relpath)
+    uncompressed = relpath[:len(relpath)-len(compression)]
+    return {'size': size, 'mtime': mtime, 'case': casename, 'batch_multiplier': batch_mult,
+            'processor': parts[0] if len(parts) > 1 else None,
+            'kind': 'processed' if uncompressed.endswith((".processed", ".processed.npz")) else 'raw',
+            'compression': compression}
+
+class Manifest:
+    ''' The files under one root directory. Hidden directories, such as caches,
+    are not indexed.
+    '''
+    def __init__(self, rootdir):
+        self.rootdir = rootdir
+        self.filename = os.path.join(rootdir, manifest_filename)
+        self.dirs = {}
+        self.changed = False
+        self.listed = 0
+        try:
+            with open(self.filename, 'r') as infile:
+                stored = json.load(infile)
+            if stored.get('version') == manifest_version:
+                self.dirs = stored['dirs']
+        except (OSError, ValueError):
+            pass
+
+    def list_directory(self, reldir, mtime, stack):
+        ''' Lists one directory, queueing its subdirectories with their mtimes.
+        '''
+        # Taken before listing, so that any change during the listing is after it
+        entry = {'mtime': mtime, 'listed': time.time_ns(), 'subdirs': [], 'files': {}}
+        with os.scandir(os.path.join(self.rootdir, reldir)) as entries:
+            for dirent in entries:
+                relpath = os.path.join(reldir, dirent.name)
+                if dirent.is_dir():
+                    if not dirent.name.startswith('.'):
+                        entry['subdirs'].append(dirent.name)
+                        stack.append((relpath, dirent.stat().st_mtime_ns))
+                elif dirent.is_file() and dirent.name != manifest_filename:
+                    st = dirent.stat()
+                    entry['files'][dirent.name] = get_file_metadata(relpath, st.st_size, st.st_mtime_ns)
+        entry['subdirs'].sort()
+        self.listed += 1
+        return entry
+
+    def update(self, verify=False):
+        ''' Brings the manifest up to date with the tree, listing only directories
+        that changed or were listed too soon after changing, or all of them with
+        verify.
+        '''
+        olddirs = self.dirs
+        self.dirs = {}
+        self.listed = 0
+        stack = [('', os.stat(self.rootdir).st_mtime_ns)]
+        while len(stack) > 0:
+            reldir, mtime = stack.pop()
+            old = olddirs.get(reldir)
+            if old is not None and old['mtime'] == mtime and not verify \
+                    and mtime + racy_margin_ns < old['listed']:
+                for name in old['subdirs']:
+                    relpath = os.path.join(reldir, name)
+                    stack.append((relpath, os.stat(os.path.join(self.rootdir, relpath)).st_mtime_ns))
+                self.dirs[reldir] = old
+            else:
+                self.dirs[reldir] = self.list_directory(reldir, mtime, stack)
+                self.changed = True
+        if len(self.dirs) != len(olddirs):
+            self.changed = True
+
+    def write(self):
+        with open(self.filename, 'w') as outfile:
+            json.dump({'version': manifest_version, 'dirs': self.dirs}, outfile)
+
+    def save(self):
+        ''' Writes the manifest if it changed. A tree that cannot be written to is
+        simply indexed again next time.
+
+        The manifest is rewritten in place rather than replaced, as adding a file
+        to the root changes the root's mtime. A partly written manifest fails to
+        parse and the tree is then listed again.
+        '''
+        if not self.changed:
+            return
+        try:
+            created = not os.path.exists(self.filename)
+            self.write()
+            if created:
+                # Creating the manifest changed the root's mtime
+                self.dirs['']['mtime'] = os.stat(self.rootdir).st_mtime_ns
+                self.write()
+            self.changed = False
+        except OSError as e:
+            print("Could not write " + self.filename + ": " + str(e))
+
+    def select(self, pattern="*", directory="", recursive=True, **metadata):
+        ''' Sorted paths, relative to the root, of the files matching a glob pattern,
+        or any of a list of them, and all given metadata values. A pattern with a
+        path separator is matched against the relative path, otherwise against the
+        file name. Only files in directory are selected, and in its subdirectories
+        if recursive.
+        '''
+        patterns = [pattern] if isinstance(pattern, str) else pattern
+        match = re.compile("|".join(fnmatch.translate(glob) for glob in patterns)).match
+        by_path = any(os.sep in glob for glob in patterns)
+        paths = []
+        for reldir in self.dirs:
+            if reldir != directory and not (recursive and (directory == ""
+                    or reldir.startswith(directory + os.sep))):
+                continue
+            files = self.dirs[reldir]['files']
+            prefix = reldir + os.sep if reldir != "" else ""
+            if by_path:
+                names = [name for name in files if match(prefix + name)]
+            else:
+                names = [name for name in files if match(name)]
+            for key in metadata:
+                names = [name for name in names if files[name][key] == metadata[key]]
+            paths.extend(prefix + name for name in names)
+        return sorted(paths)
+
+    def select_results(self, directory="", recursive=True, prefer='processed', **metadata):
+        ''' Sorted paths of the benchmark files selected like select, with one file
+        per run. Of a raw file and the files processed from it, a file of the
+        preferred kind ('processed' or 'raw') is taken if there is one.
+        '''
+        chosen = {}
+        for path in self.select(json_patterns + processed_patterns, directory, recursive, **metadata):
+            rawname = get_raw_name(path)
+            preferred = self.get_metadata(path)['kind'] == prefer
+            if rawname not in chosen or (preferred and not chosen[rawname][1]):
+                chosen[rawname] = (path, preferred)
+        return sorted(chosen[rawname][0] for rawname in chosen)
+
+    def subdirs(self, directory=""):
+        return [os.path.join(directory, name) for name in self.dirs[directory]['subdirs']]
+
+    def get_metadata(self, relpath):
+        reldir, name = os.path.split(relpath)
+        return self.dirs[reldir]['files'][name]
+
+def get_manifest(rootdir, verify=False):
+    ''' The up-to-date manifest of a tree. It is updated and saved at most once
+    per process unless verify is given.
+    '''
+    key = os.path.abspath(rootdir)
+    if key not in manifests or verify:
+        manifest = Manifest(rootdir)
+        manifest.update(verify)
+        manifest.save()
+        manifests[key] = manifest
+    return manifests[key]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Update the manifest of a result tree and list files")
+    parser.add_argument('--dir', default = os.getcwd(), help = "Root of the result tree")
+    parser.add_argument('--verify', action="store_true", help = "List every directory again")
+    parser.add_argument('--pattern', nargs='+', default = json_patterns + processed_patterns,
+            help = "Glob patterns of file names or paths")
+    parser.add_argument('--case', help = "Only files of this case")
+    parser.add_argument('--batch_multiplier', type=int, help = "Only files of this batch multiplier")
+    parser.add_argument('--processor', help = "Only files under this first-level directory")
+    parser.add_argument('--kind', help = "\'raw\' or \'processed\'")
+    parser.add_argument('--compression', help = "Only files with this suffix (e.g. .gz), or \'\' for none")
+    args = parser.parse_args()
+
+    manifest = Manifest(args.dir)
+    manifest.update(args.verify)
+    manifest.save()
+    metadata = {}
+    for key in ['case', 'batch_multiplier', 'processor', 'kind', 'compression']:
+        if getattr(args, key) is not None:
+            metadata[key] = getattr(args, key)
+    paths = manifest.select(args.pattern, **metadata)
+    for path in paths:
+        print(path)
+    nfiles = sum(len(manifest.dirs[reldir]['files']) for reldir in manifest.dirs)
+    print("Selected " + str(len(paths)) + " of " + str(nfiles) + " files in " + str(len(manifest.dirs))
+            + " directories, of which " + str(manifest.listed) + " were listed")
@@ -9,47 +9,35 @@ We assume:
 '''
 
 import os
-import json
-import re
 import argparse
 import numpy as np
 from matplotlib import pyplot as plt
 
 from utils import sort_multiple
+from json_loader import load_file
+from manifest import get_manifest
 
 textsize = 12
 
 def get_data_from_file(filename, batch_mult):
-    # Get batch size[0], total apply time[1] and component apply time[2]
+    # Get batch size and component apply time of each solver
+    record = load_file(filename, 'batch_solver')
     batch_size = 0
     times = []
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    for key in db[0]['batch_solver']:
-        batch_size = int(db[0]['batch_solver'][key]['num_batch_entries'])
-        totalapplytime = db[0]['batch_solver'][key]['apply']['time']
-        applyre = re.compile(r'apply')
-        apply_kernel_time_found = False
-        time = 0.0
-        for subkey in db[0]['batch_solver'][key]['apply']['components']:
-            if re.search(applyre, subkey):
-                apply_kernel_time_found = True
-                times.append(db[0]['batch_solver'][key]['apply']['components'][subkey])
-                break
-        assert(apply_kernel_time_found)
+    for isolver in range(len(record['solver_keys'])):
+        batch_size = int(record['batch_sizes'][isolver])
+        assert(not np.isnan(record['apply_kernel_times'][isolver]))
+        times.append(record['apply_kernel_times'][isolver])
     return batch_size, times
 
 def get_data_from_block_file(filename, batch_mult):
-    # Get batch size[0], total apply time[1] and component apply time[2]
+    # Get batch size and total apply time of each solver
+    record = load_file(filename, 'solver')
     batch_size = 0
     times = []
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    for key in db[0]['solver']:
-        batch_size = int(db[0]['solver'][key]['num_batch_entries'])
-        times.append(db[0]['solver'][key]['apply']['time'])
+    for isolver in range(len(record['solver_keys'])):
+        batch_size = int(record['batch_sizes'][isolver])
+        times.append(record['apply_times'][isolver])
     return batch_size, times
 
 def plot_per_case(batch_sizes, data, labels, opts, imageformatstring, is_log):
@@ -104,32 +92,28 @@ if __name__ == "__main__":
     labels = []
     batch_sizes = []
     
-    for dire in os.listdir(curdir):
-        dirname = os.fsdecode(dire)
-        dirpath = curdir + os.sep + dirname
-        if not os.path.isdir(dirpath):
-            continue
+    # One run per directory, with its files at any depth below it
+    manifest = get_manifest(curdir)
+    for dirname in manifest.subdirs():
         print("Found " + dirname)
         split_ = dirname.split('-')
         descript = split_[-1]
         labels.append(descript)
         data.append([])
         batch_sizes.append([])
-        for filen in os.listdir(dirpath):
-            if filen.endswith("json"):
-                fsplit = filen.split('.')[0].split('-')
-                batch_mult = int(fsplit[-1])
-                print("Case " + descript + " with batch multiplier " + str(batch_mult))
+        for path in manifest.select_results(directory=dirname):
+            batch_mult = manifest.get_metadata(path)['batch_multiplier']
+            print("Case " + descript + " with batch multiplier " + str(batch_mult))
 
-                batch_size = 0
-                times = []
-                if "block" in dirname:
-                    batch_size, times = get_data_from_block_file(dirpath + os.sep + filen, batch_mult)
-                    assert(len(times) == 1)
-                else:
-                    batch_size, times = get_data_from_file(dirpath + os.sep + filen, batch_mult)
-                    assert(len(times) == 1)
-                batch_sizes[-1].append(batch_size)
-                data[-1].append(times[0])
+            batch_size = 0
+            times = []
+            if "block" in dirname:
+                batch_size, times = get_data_from_block_file(curdir + os.sep + path, batch_mult)
+                assert(len(times) == 1)
+            else:
+                batch_size, times = get_data_from_file(curdir + os.sep + path, batch_mult)
+                assert(len(times) == 1)
+            batch_sizes[-1].append(batch_size)
+            data[-1].append(times[0])
 
     plot_per_case(batch_sizes, data, labels, opts, "png", args.log)
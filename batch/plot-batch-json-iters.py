@@ -5,73 +5,54 @@ Requires the original detailed JSON output from batched benchmark.
 """
 
 import os
-import json
-import numpy as np
-from matplotlib import pyplot as plt
+import argparse
 
-textsize = 14
-
-def get_solver_keys(filename):
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    solver_keys = []
-    for key in db[0]['batch_solver']:
-        solver_keys.append(key)
-    return solver_keys
+from render import line_spec, figure_spec, render_figures
+from extract_cache import ExtractCache
+from arguments import add_plot_arguments
+from json_loader import find_json_files, load_files, get_per_entry_arrays
+from decimate import decimate, default_max_points
 
+textsize = 14
 
-def get_data_from_file(filename, solver_keys, batch_mult):
-    # Get batch size[0], total apply time[1] and component apply time[2]
-    batch_size = 0
-    iters = []
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    for i in range(len(solver_keys)):
-        key = solver_keys[i]
-        #batch_size = int(db[0][key]['num_batch_entries'])
-        numiters_d = db[0]['batch_solver'][key]['num_iters']
-        batch_size = len(numiters_d)
-        solver_iters = [0 for i in range(batch_size)]
-        for i in range(batch_size):
-            solver_iters[i] = numiters_d[str(i)][0]
-        iters.append(solver_iters)
+def get_data_from_file(record, solver_keys, batch_mult):
+    # Get batch size and per-entry iteration counts, shape (n_solvers, batch_size)
+    iters = get_per_entry_arrays(record, solver_keys)['num_iters']
     filedict = {}
-    filedict['batch_size'] = batch_size
+    filedict['batch_size'] = iters.shape[1]
     filedict['batch_multiplier'] = batch_mult
     filedict['num_iters'] = iters
     return filedict
 
-def plot_curve(iterdict, solver_keys, opts, imageformatstring):
+def plot_curve(iterdict, solver_keys, opts, imageformatstring, jobs=1, max_points=default_max_points):
     '''
-    Plot one plot for each case.
+    Plot one plot for each case. Larger batches are decimated to about max_points
+    points per solver, keeping the minimum and maximum of each stretch of entries.
     '''
-    plt.rcParams.update({'font.size': textsize})
+    specs = []
     for casekey in iterdict:
-        plt.close()
         casename = iterdict[casekey]
         batch_size = casename['batch_size']
         print("Batch size is " + str(batch_size))
+        indices, iters = decimate(casename['num_iters'], max_points)
+        lines = []
         for isolver in range(len(solver_keys)):
-            timings = np.zeros((batch_size))
-            for ipos in range(batch_size):
-                timings[ipos] = casename['num_iters'][isolver][ipos]
-            plt.plot(timings[:], lw=opts['linewidth'], ls=opts['linetype'][isolver], \
-                    color=opts['colorlist'][isolver], \
-                    marker=opts['marklist'][isolver], ms=opts['marksize'], \
-                    mew=opts['markedgewidth'], \
-                    label= solver_keys[isolver])
-        plt.legend(loc="best")
-        #plt.legend(loc="upper left", fontsize="medium")
-        plt.xlabel("Matrix index in the batch")
-        plt.ylabel("Iterations")
-        plt.grid('on')
-        plt.savefig(casekey+"-iters." + imageformatstring, dpi=200, bbox_inches='tight')
+            x = indices[isolver,:] if indices is not None else None
+            lines.append(line_spec('plot', x, iters[isolver,:], opts, isolver, solver_keys[isolver]))
+        #legend = {'loc': "upper left", 'fontsize': "medium"}
+        specs.append(figure_spec(casekey+"-iters." + imageformatstring, lines,
+                "Matrix index in the batch", "Iterations", rcparams={'font.size': textsize}))
+    render_figures(specs, jobs)
     return
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description = "Plot iteration counts of a batch problem.")
+    add_plot_arguments(parser, stream=True)
+    parser.add_argument('--max_points', type=int, default=default_max_points,
+            help = "Largest number of points plotted per solver; larger batches keep each stretch's min and max")
+    args = parser.parse_args()
+
     opts = { \
          "marklist" : ['.', 'x', '+', '^', 'v', '<', '>', 'd'],
          "colorlist" : ['k', 'b', 'r', 'g', 'c', 'm', 'orange', 'pink'],
@@ -83,29 +64,27 @@ if __name__ == "__main__":
 
     curdir = os.getcwd()
 
-    first_filename = ""
     datadict = {}
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            first_filename = filename
-            break
-    if first_filename == "":
+    # Processed files may lack the per-entry data
+    filenames = find_json_files(curdir, prefer='raw')
+    if len(filenames) == 0:
         print("No JSON files found in the current directory.")
         exit()
-    solver_keys = get_solver_keys(first_filename)
+    cache = None
+    if args.cache:
+        cache = ExtractCache(curdir)
+    records = load_files(filenames, 'batch_solver', args.stream, cache=cache)
+    solver_keys = records[filenames[0]]['solver_keys']
     print("Found solvers" + str(solver_keys))
 
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            print("Found " + filename)
-            split_ = filename.split('_')
-            casename = '_'.join(split_[0:-1])
-            batch_mult = int(split_[-1].split('.')[0][1:])
-            print("Case " + casename + " with batch multiplier " + str(batch_mult))
-            assert(batch_mult == 1)
-            file_dict = get_data_from_file(filename, solver_keys, batch_mult)
-            datadict[casename] = file_dict
-    plot_curve(datadict, solver_keys, opts, "png")
+    for filename in filenames:
+        print("Found " + filename)
+        split_ = filename.split('_')
+        casename = '_'.join(split_[0:-1])
+        batch_mult = int(split_[-1].split('.')[0][1:])
+        print("Case " + casename + " with batch multiplier " + str(batch_mult))
+        assert(batch_mult == 1)
+        file_dict = get_data_from_file(records[filename], solver_keys, batch_mult)
+        datadict[casename] = file_dict
+    plot_curve(datadict, solver_keys, opts, "png", args.jobs, args.max_points)
@@ -5,100 +5,64 @@ Requires the original detailed JSON output from batched benchmark.
 """
 
 import os
-import json
 import argparse
 import numpy as np
-from matplotlib import pyplot as plt
 
-textsize = 16
-
-def get_solver_keys(filename):
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    solver_keys = []
-    for key in db[0]['batch_solver']:
-        solver_keys.append(key)
-    return solver_keys
+from render import line_spec, figure_spec, render_figures
+from extract_cache import ExtractCache
+from arguments import add_plot_arguments
+from json_loader import find_json_files, load_files, get_per_entry_arrays
+from decimate import decimate, default_max_points
 
+textsize = 16
 
-def get_data_from_file(filename, solver_keys, batch_mult):
-    # Get batch size[0], total apply time[1] and component apply time[2]
-    batch_size = 0
-    resnorms = []
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    for i in range(len(solver_keys)):
-        key = solver_keys[i]
-        #batch_size = int(db[0][key]['num_batch_entries'])
-        resnorm_d = db[0]['batch_solver'][key]['residual_norm']
-        batch_size = len(resnorm_d)
-        solver_norms = [0 for i in range(batch_size)]
-        for i in range(batch_size):
-            solver_norms[i] = resnorm_d[str(i)][0]
-        resnorms.append(solver_norms)
-    bnorms = [0 for i in range(batch_size)]
-    b_d = db[0]['batch_solver'][key]['rhs_norm']
-    for i in range(batch_size):
-        bnorms[i] = b_d[str(i)][0]
+def get_data_from_file(record, solver_keys, batch_mult):
+    # Get batch size, per-entry residual norms and RHS norms, shape (n_solvers, batch_size)
+    arrays = get_per_entry_arrays(record, solver_keys)
     filedict = {}
-    filedict['batch_size'] = batch_size
+    filedict['batch_size'] = arrays['residual_norm'].shape[1]
     filedict['batch_multiplier'] = batch_mult
-    filedict['residual_norm'] = resnorms
-    filedict['rhs_norm'] = bnorms
+    filedict['residual_norm'] = arrays['residual_norm']
+    filedict['rhs_norm'] = arrays['rhs_norm']
     return filedict
 
-def plot_curve(normdict, solver_keys, opts, imageformatstring, normtype, relcheck_limit):
+def plot_curve(normdict, solver_keys, opts, imageformatstring, normtype, relcheck_limit, jobs=1,
+        max_points=default_max_points):
     '''
-    Plot one plot for each case.
+    Plot one plot for each case. Larger batches are decimated to about max_points
+    points per solver, keeping the minimum and maximum of each stretch of entries.
     '''
-    plt.rcParams.update({'font.size': textsize})
+    specs = []
     for casekey in normdict:
-        plt.close()
         casename = normdict[casekey]
         batch_size = casename['batch_size']
         print("Batch size is " + str(batch_size))
-        maxnorm = 0.0
-        minnorm = 1e10
+        if normtype == "absolute":
+            norms = casename['residual_norm']
+            ylabel = "Log(10) residual 2-norm"
+        else:
+            norms = casename['residual_norm'] / casename['rhs_norm']
+            ylabel = "Log(10) (residual 2-norm / RHS 2-norm)"
+        indices, lognorms = decimate(np.log10(norms), max_points)
+        maxnorms = np.max(norms, axis=1)
+        minnorms = np.min(norms, axis=1)
+        lines = []
         for isolver in range(len(solver_keys)):
-            norms = np.zeros((batch_size))
-            b_norms = np.zeros((batch_size))
-            for ipos in range(batch_size):
-                norms[ipos] = casename['residual_norm'][isolver][ipos]
-                b_norms[ipos] = casename['rhs_norm'][ipos]
-            maxnorml = 0.0
-            minnorml = 0.0
+            x = indices[isolver,:] if indices is not None else None
+            lines.append(line_spec('plot', x, lognorms[isolver,:], opts, isolver,
+                    solver_keys[isolver]))
             if normtype == "absolute":
-                plt.plot(np.log10(norms[:]), lw=opts['linewidth'], ls=opts['linetype'][isolver], \
-                        color=opts['colorlist'][isolver], \
-                        marker=opts['marklist'][isolver], ms=opts['marksize'], \
-                        mew=opts['markedgewidth'], \
-                        label= solver_keys[isolver])
-                plt.ylabel("Log(10) residual 2-norm")
-                maxnorml = np.max(norms[:])
-                minnorml = np.min(norms[:])
-                print("Max norm = " + str(maxnorml))
-                print("Min norm = " + str(minnorml))
+                print("Max norm = " + str(maxnorms[isolver]))
+                print("Min norm = " + str(minnorms[isolver]))
                 print()
             else:
-                plt.plot(np.log10(norms[:]/b_norms[:]), lw=opts['linewidth'], ls=opts['linetype'][isolver], \
-                        color=opts['colorlist'][isolver], \
-                        marker=opts['marklist'][isolver], ms=opts['marksize'], \
-                        mew=opts['markedgewidth'], \
-                        label= solver_keys[isolver])
-                plt.ylabel("Log(10) (residual 2-norm / RHS 2-norm)")
-                maxnorml = np.max(norms[:]/b_norms[:])
-                minnorml = np.min(norms[:]/b_norms[:])
-                print("Maximum norm = " + str(maxnorml))
-                if relcheck_limit != 0.0:
-                    if maxnorml > relcheck_limit:
-                        print(solver_keys[isolver] + " DID NOT CONVERGE TO TOLERANCE " + str(relcheck_limit) + "!!")
-            if maxnorml > maxnorm:
-                maxnorm = maxnorml
-            if minnorml < minnorm:
-                minnorm = minnorml
-        plt.legend(loc="best", fontsize="medium")
+                print("Maximum norm = " + str(maxnorms[isolver]))
+        if normtype != "absolute" and relcheck_limit != 0.0:
+            not_converged = maxnorms > relcheck_limit
+            for isolver in np.flatnonzero(not_converged):
+                print(solver_keys[isolver] + " DID NOT CONVERGE TO TOLERANCE " + str(relcheck_limit) + "!!")
+        maxnorm = max(0.0, np.max(maxnorms))
+        minnorm = min(1e10, np.min(minnorms))
 
         if minnorm < 1e-50:
             minnorm = 1e-50
@@ -108,11 +72,11 @@ def plot_curve(normdict, solver_keys, opts, imageformatstring, normtype, relchec
         else:
             if maxnorm > 1:
                 maxnorm = 1.0
-        plt.ylim(np.log10(0.5*minnorm), np.log10(10*maxnorm))
-        plt.xlabel("Matrix index in the batch")
-        plt.grid('on')
         outfname = casekey + "-" + normtype + "-resnorms." + imageformatstring
-        plt.savefig(outfname, dpi=200, bbox_inches='tight')
+        specs.append(figure_spec(outfname, lines, "Matrix index in the batch", ylabel,
+                rcparams={'font.size': textsize}, legend={'loc': "best", 'fontsize': "medium"},
+                ylim=(np.log10(0.5*minnorm), np.log10(10*maxnorm))))
+    render_figures(specs, jobs)
     return
 
 if __name__ == "__main__":
@@ -120,6 +84,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description = "Plot residual norms of a batch problem.")
     parser.add_argument('--type', default = "relative", help = "Plot \'absolute\' or \'relative\' norm")
     parser.add_argument('--relative_check', default = 0.0, type=float, help = "Threshold value that all relative norms should be below")
+    add_plot_arguments(parser, stream=True)
+    parser.add_argument('--max_points', type=int, default=default_max_points,
+            help = "Largest number of points plotted per solver; larger batches keep each stretch's min and max")
     args = parser.parse_args()
     print("Norm type to plot: " + args.type + ", relative check threshold = " + str(args.relative_check))
 
@@ -134,29 +101,28 @@ if __name__ == "__main__":
 
     curdir = os.getcwd()
 
-    first_filename = ""
     datadict = {}
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            first_filename = filename
-            break
-    if first_filename == "":
+    # Processed files may lack the per-entry data
+    filenames = find_json_files(curdir, prefer='raw')
+    if len(filenames) == 0:
         print("No JSON files found in the current directory.")
         exit()
-    solver_keys = get_solver_keys(first_filename)
+    cache = None
+    if args.cache:
+        cache = ExtractCache(curdir)
+    records = load_files(filenames, 'batch_solver', args.stream, cache=cache)
+    solver_keys = records[filenames[0]]['solver_keys']
     print("Found solvers" + str(solver_keys))
 
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            print("Found " + filename)
-            split_ = filename.split('_')
-            casename = '_'.join(split_[0:-1])
-            batch_mult = int(split_[-1].split('.')[0][1:])
-            print("Case " + casename + " with batch multiplier " + str(batch_mult))
-            assert(batch_mult == 1)
-            file_dict = get_data_from_file(filename, solver_keys, batch_mult)
-            datadict[casename] = file_dict
-    plot_curve(datadict, solver_keys, opts, "png", args.type, args.relative_check)
+    for filename in filenames:
+        print("Found " + filename)
+        split_ = filename.split('_')
+        casename = '_'.join(split_[0:-1])
+        batch_mult = int(split_[-1].split('.')[0][1:])
+        print("Case " + casename + " with batch multiplier " + str(batch_mult))
+        assert(batch_mult == 1)
+        file_dict = get_data_from_file(records[filename], solver_keys, batch_mult)
+        datadict[casename] = file_dict
+    plot_curve(datadict, solver_keys, opts, "png", args.type, args.relative_check, args.jobs,
+            args.max_points)
@@ -9,49 +9,30 @@ We assume:
 '''
 
 import os
-import json
-import re
 import numpy as np
 from matplotlib import pyplot as plt
 
 from utils import sort_multiple
+from json_loader import find_json_files, load_files, get_solver_index
 
 textsize = 16
 
-def get_data_from_file(filename, solver_keys, batch_mult):
+def get_data_from_file(record, solver_keys, batch_mult):
     # Get batch size[0], total apply time[1] and component apply time[2]
     batch_size = 0
     data = np.zeros((len(solver_keys),2))
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
     for i in range(len(solver_keys)):
-        key = solver_keys[i]
-        batch_size = int(db[0][key]['num_batch_entries'])
-        data[i,0] = db[0][key]['apply']['time']
-        applyre = re.compile(r'apply')
-        apply_kernel_time_found = False
-        for subkey in db[0][key]['apply']['components']:
-            if re.search(applyre, subkey):
-                apply_kernel_time_found = True
-                data[i,1] = db[0][key]['apply']['components'][subkey]
-                break
-        assert(apply_kernel_time_found)
+        isolver = get_solver_index(record, solver_keys[i])
+        batch_size = int(record['batch_sizes'][isolver])
+        data[i,0] = record['apply_times'][isolver]
+        assert(not np.isnan(record['apply_kernel_times'][isolver]))
+        data[i,1] = record['apply_kernel_times'][isolver]
     filedict = {}
     filedict['batch_size'] = batch_size
     filedict['batch_multiplier'] = batch_mult
     filedict['timings'] = data
     return filedict
 
-def get_solver_keys(filename):
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    solver_keys = []
-    for key in db[0]:
-        solver_keys.append(key)
-    return solver_keys
-
 def plot_per_case(datadict, solver_keys, opts, imageformatstring):
     '''
     Plot one plot for each case.
@@ -112,32 +93,26 @@ if __name__ == "__main__":
     curdir = os.getcwd()
     
     datadict = {}
-    first_filename = ""
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            first_filename = filename
-            break
-    if first_filename == "":
+    filenames = find_json_files(curdir)
+    if len(filenames) == 0:
         print("No JSON files found in the current directory.")
         exit()
+    records = load_files(filenames, None)
     
-    solver_keys = get_solver_keys(first_filename)
+    solver_keys = records[filenames[0]]['solver_keys']
     print("Found solvers" + str(solver_keys))
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            print("Found " + filename)
-            split_ = filename.split('_')
-            casename = '_'.join(split_[0:-1])
-            batch_mult = int(split_[-1].split('.')[0][1:])
-            print("Case " + casename + " with batch multiplier " + str(batch_mult))
+    for filename in filenames:
+        print("Found " + filename)
+        split_ = filename.split('_')
+        casename = '_'.join(split_[0:-1])
+        batch_mult = int(split_[-1].split('.')[0][1:])
+        print("Case " + casename + " with batch multiplier " + str(batch_mult))
     
-            if casename not in datadict:
-                datadict[casename] = []
-            file_dict = get_data_from_file(filename, solver_keys, batch_mult)
-            datadict[casename].append(file_dict)
+        if casename not in datadict:
+            datadict[casename] = []
+        file_dict = get_data_from_file(records[filename], solver_keys, batch_mult)
+        datadict[casename].append(file_dict)
 
     plot_per_case(datadict, solver_keys, opts, "png")
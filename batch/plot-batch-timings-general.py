@@ -10,106 +10,142 @@ We assume:
 '''
 
 import os
-import json
-import re
 import argparse
 import numpy as np
-from matplotlib import pyplot as plt
 
 from utils import sort_multiple
+from render import line_spec, figure_spec, render_figures
+from extract_cache import ExtractCache
+from arguments import add_plot_arguments
+from json_loader import find_json_files, load_files, get_solver_index
 
 #textsize = 16
 textsize = 12
 
-def get_solver_keys(filename, run_type):
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    solver_keys = []
-    for key in db[0][run_type]:
-        solver_keys.append(key)
-    return solver_keys
-
-def get_data_from_file(filename, run_type, solver_keys, batch_mult):
+def get_data_from_file(record, solver_keys, batch_mult):
     # Get batch size and component apply time
     batch_size = 0
     data = [0.0 for i in solver_keys]
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    dbt = db[0][run_type]
+    run_type = record['run_type']
     for i in range(len(solver_keys)):
-        key = solver_keys[i]
-        batch_size = int(dbt[key]['num_batch_entries'])
-        #data[i] = dbt[key]['apply']['time'] # Total apply time
+        isolver = get_solver_index(record, solver_keys[i])
+        batch_size = int(record['batch_sizes'][isolver])
+        #data[i] = record['apply_times'][isolver] # Total apply time
         if "solver" in run_type:
-            applyre = re.compile(r'apply')
-            apply_kernel_time_found = False
-            for subkey in dbt[key]['apply']['components']:
-                if re.search(applyre, subkey):
-                    apply_kernel_time_found = True
-                    data[i] = dbt[key]['apply']['components'][subkey]
-                    break
-            assert(apply_kernel_time_found)
+            assert(not np.isnan(record['apply_kernel_times'][isolver]))
+            data[i] = record['apply_kernel_times'][isolver]
         elif run_type == "spmv":
-            data[i] = dbt[key]['time']
+            data[i] = record['times'][isolver]
     filedict = {}
     filedict['batch_size'] = batch_size
     filedict['batch_multiplier'] = batch_mult
     filedict['timings'] = data
     return filedict
 
-def plot_per_case(datadict, solver_keys, plotlog, opts, imageformatstring):
+def get_datadict_from_dataset(filename, run_type, processor):
+    ''' Per-case data as built from the JSON files, but from a dataset written by
+    build_dataset.py. Returns the data dict and the solver keys.
+    '''
+    # Reading the dataset needs pandas
+    from build_dataset import read_dataset
+    df = read_dataset(filename)
+    if processor is not None:
+        df = df[df['processor'] == processor]
+    column = 'apply_time' if "solver" in run_type else 'total_time'
+    files = df.groupby('file', observed=True, sort=False)
+    solver_keys = None
+    datadict = {}
+    for filekey, filedf in files:
+        solvers = [str(solver) for solver in filedf['solver']]
+        if solver_keys is None:
+            solver_keys = solvers
+            print("Found runs " + str(solver_keys))
+        casename = str(filedf['case'].iloc[0])
+        filedict = {}
+        filedict['batch_size'] = int(filedf['batch_size'].iloc[solvers.index(solver_keys[-1])])
+        filedict['batch_multiplier'] = int(filedf['batch_multiplier'].iloc[0])
+        filedict['timings'] = [filedf[column].iloc[solvers.index(key)] for key in solver_keys]
+        assert(not np.any(np.isnan(filedict['timings'])))
+        if casename not in datadict:
+            datadict[casename] = []
+        datadict[casename].append(filedict)
+    return datadict, solver_keys
+
+def get_datadict_from_stats(filename, run_type, processor, resamples):
+    ''' Like get_datadict_from_dataset, but with repeated runs of a batch size
+    reduced to their median, and the bootstrap confidence interval of the median
+    in 'errors'.
+    '''
+    from build_dataset import read_dataset
+    from run_stats import compute_stats, get_errors
+    df = read_dataset(filename)
+    if processor is not None:
+        df = df[df['processor'] == processor]
+    column = 'apply_time' if "solver" in run_type else 'total_time'
+    stats = compute_stats(df, column, resamples)
+    solver_keys = [str(solver) for solver in stats['solver'].unique()]
+    print("Found runs " + str(solver_keys) + " repeated up to " + str(stats['runs'].max()) + " times")
+    datadict = {}
+    for (casename, batch_size), sizedf in stats.groupby(['case', 'batch_size'], observed=True, sort=False):
+        solvers = [str(solver) for solver in sizedf['solver']]
+        isolvers = [solvers.index(key) for key in solver_keys]
+        errors = get_errors(sizedf)
+        filedict = {}
+        filedict['batch_size'] = int(batch_size)
+        filedict['timings'] = [sizedf['median'].iloc[i] for i in isolvers]
+        filedict['errors'] = [errors[:, i] for i in isolvers]
+        if str(casename) not in datadict:
+            datadict[str(casename)] = []
+        datadict[str(casename)].append(filedict)
+    return datadict, solver_keys
+
+def plot_per_case(datadict, solver_keys, plotlog, opts, imageformatstring, jobs=1):
     '''
     Plot one plot for each case.
     '''
-    plt.rcParams.update({'font.size': textsize})
+    specs = []
     for casekey in datadict:
-        plt.close()
         casename = datadict[casekey]
         num_dupl = len(casename)
         batchsizes = np.zeros(num_dupl)
         maxtime = 0.0
         mintime = 10000.0
+        lines = []
+        has_errors = 'errors' in casename[0]
         for isolver in range(len(solver_keys)):
-            timings = np.zeros((num_dupl, 1))
+            # Timings, then the error bar lengths below and above
+            timings = np.zeros((num_dupl, 3))
             ipos = 0
             for filepart in casename:
                 timings[ipos,0] = filepart['timings'][isolver]*1000
+                if has_errors:
+                    timings[ipos,1:] = filepart['errors'][isolver]*1000
                 batchsizes[ipos] = filepart['batch_size']
                 ipos += 1
             sort_multiple(batchsizes, timings)
-            if plotlog:
-                plt.semilogy(batchsizes, timings[:,0], lw=opts['linewidth'], \
-                    ls=opts['linetype'][isolver], color=opts['colorlist'][isolver], \
-                    marker=opts['marklist'][isolver], ms=opts['marksize'], \
-                    mew=opts['markedgewidth'], \
-                    label= solver_keys[isolver])
-            else:
-                plt.plot(batchsizes, timings[:,0], lw=opts['linewidth'], \
-                    ls=opts['linetype'][isolver], color=opts['colorlist'][isolver], \
-                    marker=opts['marklist'][isolver], ms=opts['marksize'], \
-                    mew=opts['markedgewidth'], \
-                    label= solver_keys[isolver])
-            thismax = np.max(timings[:,0])
-            thismin = np.min(timings[:,0])
+            plotter = 'semilogy' if plotlog else 'plot'
+            yerr = timings[:,1:].T.copy() if has_errors else None
+            lines.append(line_spec(plotter, batchsizes.copy(), timings[:,0], opts, isolver,
+                    solver_keys[isolver], yerr))
+            thismax = np.max(timings[:,0] + timings[:,2])
+            thismin = np.min(timings[:,0] - timings[:,1])
             if thismax > maxtime:
                 maxtime = thismax
             if thismin < mintime:
                 mintime = thismin
-        plt.legend(loc="best", fontsize="medium")
-        #plt.legend(loc="upper left", fontsize="medium")
-        plt.tight_layout()
-        plt.xlabel("No. matrices in the batch")
-        plt.ylabel("Time (ms)")
+        #legend = {'loc': "upper left", 'fontsize': "medium"}
+        legend = {'loc': "best", 'fontsize': "medium"}
         if plotlog:
-            plt.grid('on',which='both')
-            plt.grid('on',which='minor', ls=':', color='0.5')
+            ylim = None
+            grid = [(('on',), {'which': 'both'}), (('on',), {'which': 'minor', 'ls': ':', 'color': '0.5'})]
         else:
             yrange = maxtime-mintime
-            plt.ylim(mintime-0.1*yrange, maxtime+0.1*yrange)
-            plt.grid('on')
-        plt.savefig(casekey+"-timings." + imageformatstring, dpi=200, bbox_inches='tight')
+            ylim = (mintime-0.1*yrange, maxtime+0.1*yrange)
+            grid = [(('on',), {})]
+        specs.append(figure_spec(casekey+"-timings." + imageformatstring, lines,
+                "No. matrices in the batch", "Time (ms)", rcparams={'font.size': textsize},
+                legend=legend, tight_layout=True, ylim=ylim, grid=grid))
+    render_figures(specs, jobs)
     return
 
 if __name__ == "__main__":
@@ -128,41 +164,54 @@ if __name__ == "__main__":
     parser.add_argument('--log', help = "For log y axis",
             action="store_true")
     parser.add_argument("--run_type", help = "\'spmv\' or \'batch_solver\'")
+    add_plot_arguments(parser)
+    parser.add_argument('--dataset', help = "Read the runs from this file of build_dataset.py"
+            + " instead of the JSON files in the current directory")
+    parser.add_argument('--processor', help = "With --dataset, only plot the runs on this processor")
+    parser.add_argument('--error_bars', action="store_true", help = "With --dataset, plot the median of"
+            + " repeated runs with error bars of its bootstrap confidence interval")
+    parser.add_argument('--resamples', type=int, default=1000, help = "Bootstrap resamples for --error_bars")
     args = parser.parse_args()
 
+    if args.dataset is not None:
+        if args.error_bars:
+            datadict, solver_keys = get_datadict_from_stats(args.dataset, args.run_type, args.processor,
+                    args.resamples)
+        else:
+            datadict, solver_keys = get_datadict_from_dataset(args.dataset, args.run_type, args.processor)
+        print("Found " + str(len(datadict)) + " different cases.")
+        plot_per_case(datadict, solver_keys, args.log, opts, "png", args.jobs)
+        exit()
+
     curdir = os.getcwd()
     
     datadict = {}
-    first_filename = ""
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            first_filename = filename
-            break
-    if first_filename == "":
+    filenames = find_json_files(curdir)
+    if len(filenames) == 0:
         print("No JSON files found in the current directory.")
         exit()
+    cache = None
+    if args.cache:
+        cache = ExtractCache(curdir)
+    records = load_files(filenames, args.run_type, cache=cache)
     
-    solver_keys = get_solver_keys(first_filename, args.run_type)
+    solver_keys = records[filenames[0]]['solver_keys']
     print("Found runs " + str(solver_keys))
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            print("Found " + filename)
-            split_ = filename.split('_')
-            casename = '_'.join(split_[0:-1])
-            batch_mult = int(split_[-1].split('.')[0][1:])
-            print("Case " + casename + " with batch multiplier " + str(batch_mult))
+    for filename in filenames:
+        print("Found " + filename)
+        split_ = filename.split('_')
+        casename = '_'.join(split_[0:-1])
+        batch_mult = int(split_[-1].split('.')[0][1:])
+        print("Case " + casename + " with batch multiplier " + str(batch_mult))
     
-            if casename not in datadict:
-                datadict[casename] = []
-            file_dict = get_data_from_file(filename, args.run_type, solver_keys,
-                    batch_mult)
-            datadict[casename].append(file_dict)
+        if casename not in datadict:
+            datadict[casename] = []
+        file_dict = get_data_from_file(records[filename], solver_keys, batch_mult)
+        datadict[casename].append(file_dict)
 
     print("Found " + str(len(datadict)) + " different cases.")
 
-    plot_per_case(datadict, solver_keys, args.log, opts, "png")
+    plot_per_case(datadict, solver_keys, args.log, opts, "png", args.jobs)
 
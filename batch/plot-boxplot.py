@@ -3,6 +3,8 @@ import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 
+from build_dataset import read_table
+
 opts = { \
      "marklist" : ['+', '.', '+', '.', 'v', '<', '>', 'd', 'x', '^'],
      "colorlist" : ['g', 'g', 'r', 'r', 'b', 'm', 'pink', 'k', 'c', 'orange'],
@@ -16,7 +18,8 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(
         description = "Plot timing comparison of batch problem")
-    parser.add_argument('files', nargs='+', help = "Files to read from")
+    parser.add_argument('files', nargs='+',
+            help = "Tables from create_table_from_json.py or datasets from build_dataset.py")
     #parser.add_argument('--base_columns', nargs='+', help = "Columns that determine each base case (1 set of boxes for each)")
     #parser.add_argument('--base_values', nargs='+', help = "Value in the base_column corresponding to base case")
     parser.add_argument('--log', help = "For log y axis",
@@ -26,10 +29,10 @@ if __name__ == "__main__":
     plt.close()
     fig,ax1 = plt.subplots()
         
-    df = pd.read_csv(args.files[0], sep=' ')
+    df = pd.concat([read_table(filen) for filen in args.files], ignore_index=True)
     basevalsdf = df.loc[df['processor'] == 'skylake']
-    basevals = df['solve time (s)'].to_numpy()
-    cases = df['case name'].unique()
+    basevals = df['apply_time'].to_numpy()
+    cases = df['case'].unique()
     nplots = len(cases)
     processors = df['processor'].unique()
     x = np.arange(len(processors))
@@ -39,7 +42,7 @@ if __name__ == "__main__":
     #    dfplot = df.loc[df['case name'] == cases[iplot]]
     #    #dfplot.boxplot(by='processor', ax=ax1, width=0.8*width, positions=x + iplot*width)
     #    dfplot.boxplot(column=['solve time (s)'], by='processor', ax=ax1)
-    df.boxplot(column=['solve time (s)'], by=['processor','case name'], ax=ax1)
+    df.boxplot(column=['apply_time'], by=['processor','case'], ax=ax1)
     plt.tight_layout()
     plt.show()
     
@@ -10,70 +10,52 @@ We assume:
 '''
 
 import os
-import json
-import re
 import argparse
 import numpy as np
-from matplotlib import pyplot as plt
 
 from utils import sort_multiple
+from render import line_spec, figure_spec, render_figures
+from extract_cache import ExtractCache
+from arguments import add_plot_arguments
+from json_loader import find_json_files, load_files, get_solver_index
 
 #textsize = 16
 textsize = 12
 
-def get_solver_and_matrix_format_keys(filename, run_type):
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
-    matrix_keys = []
-    solver_keys = []
-    for key in db[0][run_type]:
-        solver_keys.append(key)
-        matrix_keys.append(db[0][run_type][key]['matrix_format'])
-    return solver_keys, matrix_keys
-
-def get_data_from_file(filename, run_type, solver_name, batch_mult):
+def get_data_from_file(record, solver_name, batch_mult):
     # Get batch size and component apply time
     batch_size = 0
     data = 0.0
     mat_format = ''
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
+    run_type = record['run_type']
     # Assume just one solver
-    dbt = db[0][run_type][solver_name]
-    mat_format = dbt['matrix_format']
+    isolver = get_solver_index(record, solver_name)
+    mat_format = record['matrix_formats'][isolver]
 
-    batch_size = int(dbt['num_batch_entries'])
+    batch_size = int(record['batch_sizes'][isolver])
     if "solver" in run_type:
-        applyre = re.compile(r'apply')
-        apply_kernel_time_found = False
-        for subkey in dbt['apply']['components']:
-            if re.search(applyre, subkey):
-                apply_kernel_time_found = True
-                data = dbt['apply']['components'][subkey]
-                break
-        assert(apply_kernel_time_found)
+        assert(not np.isnan(record['apply_kernel_times'][isolver]))
+        data = record['apply_kernel_times'][isolver]
     elif run_type == "spmv":
-        data[i] = dbt['time']
+        data = record['times'][isolver]
     filedict = {}
     filedict['batch_size'] = batch_size
     filedict['batch_multiplier'] = batch_mult
     filedict['timings'] = data
     return mat_format, filedict
 
-def plot_per_case(datadict, plotlog, solver_name, opts, imageformatstring):
+def get_case_figures(datadict, plotlog, solver_name, opts, imageformatstring):
     '''
-    Plot one plot for each case.
+    Describe one plot for each case; returns a list of figure specs for render_figures.
     '''
-    plt.rcParams.update({'font.size': textsize})
+    specs = []
     for casekey in datadict:
-        plt.close()
         print("Plotting " + casekey)
         casedict = datadict[casekey]
         maxtime = 0.0
         mintime = 10000.0
         iformat = 0
+        lines = []
         for mat_format in casedict:
             num_dupl = len(casedict[mat_format])
             print("   Potting " + mat_format + " with " + str(num_dupl) + " duplications")
@@ -85,18 +67,8 @@ def plot_per_case(datadict, plotlog, solver_name, opts, imageformatstring):
                 batchsizes[ipos] = filepart['batch_size']
                 ipos += 1
             sort_multiple(batchsizes, timings)
-            if plotlog:
-                plt.semilogy(batchsizes, timings[:,0], lw=opts['linewidth'], \
-                    ls=opts['linetype'][iformat], color=opts['colorlist'][iformat], \
-                    marker=opts['marklist'][iformat], ms=opts['marksize'], \
-                    mew=opts['markedgewidth'], \
-                    label= mat_format)
-            else:
-                plt.plot(batchsizes, timings[:,0], lw=opts['linewidth'], \
-                    ls=opts['linetype'][iformat], color=opts['colorlist'][iformat], \
-                    marker=opts['marklist'][iformat], ms=opts['marksize'], \
-                    mew=opts['markedgewidth'], \
-                    label= mat_format)
+            plotter = 'semilogy' if plotlog else 'plot'
+            lines.append(line_spec(plotter, batchsizes, timings[:,0], opts, iformat, mat_format))
             thismax = np.max(timings[:,0])
             thismin = np.min(timings[:,0])
             if thismax > maxtime:
@@ -104,20 +76,19 @@ def plot_per_case(datadict, plotlog, solver_name, opts, imageformatstring):
             if thismin < mintime:
                 mintime = thismin
             iformat += 1
-        plt.legend(loc="best", fontsize="medium")
-        #plt.legend(loc="upper left", fontsize="medium")
-        plt.tight_layout()
-        plt.xlabel("No. matrices in the batch")
-        plt.ylabel("Time (ms)")
+        #legend = {'loc': "upper left", 'fontsize': "medium"}
+        legend = {'loc': "best", 'fontsize': "medium"}
         if plotlog:
-            plt.grid('on',which='both')
-            plt.grid('on',which='minor', ls=':', color='0.5')
+            ylim = None
+            grid = [(('on',), {'which': 'both'}), (('on',), {'which': 'minor', 'ls': ':', 'color': '0.5'})]
         else:
             yrange = maxtime-mintime
-            plt.ylim(mintime-0.1*yrange, maxtime+0.1*yrange)
-            plt.grid('on')
-        plt.savefig(casekey+"-"+solver_name+"-timings." + imageformatstring, dpi=200, bbox_inches='tight')
-    return
+            ylim = (mintime-0.1*yrange, maxtime+0.1*yrange)
+            grid = [(('on',), {})]
+        specs.append(figure_spec(casekey+"-"+solver_name+"-timings." + imageformatstring, lines,
+                "No. matrices in the batch", "Time (ms)", rcparams={'font.size': textsize},
+                legend=legend, tight_layout=True, ylim=ylim, grid=grid))
+    return specs
 
 if __name__ == "__main__":
 
@@ -135,44 +106,44 @@ if __name__ == "__main__":
     parser.add_argument('--log', help = "For log y axis",
             action="store_true")
     parser.add_argument("--run_type", help = "\'spmv\' or \'batch_solver\'")
+    add_plot_arguments(parser)
     args = parser.parse_args()
 
     curdir = os.getcwd()
     
-    datadict = {}
-    first_filename = ""
-    
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            first_filename = filename
-            break
-    if first_filename == "":
+    filenames = find_json_files(curdir)
+    if len(filenames) == 0:
         print("No JSON files found in the current directory.")
         exit()
+    cache = None
+    if args.cache:
+        cache = ExtractCache(curdir)
+    records = load_files(filenames, args.run_type, cache=cache)
     
-    solver_keys,mat_format_keys = get_solver_and_matrix_format_keys(first_filename, args.run_type)
+    first_record = records[filenames[0]]
+    solver_keys = first_record['solver_keys']
+    mat_format_keys = first_record['matrix_formats']
     print("Found runs " + str(mat_format_keys))
     print("Found solvers: " + str(solver_keys))
 
+    specs = []
     for isolver in range(len(solver_keys)):
     
-        for file in os.listdir(curdir):
-            filename = os.fsdecode(file)
-            if filename.endswith(".json"):
-                print("Found " + filename)
-                split_ = filename.split('-')
-                casename = split_[0]
-                batch_mult = int(split_[-1].split('.')[0])
-                print("Case " + casename + " with batch multiplier " + str(batch_mult))
-        
-                if casename not in datadict:
-                    datadict[casename] = {}
-                mat_format, file_dict = get_data_from_file(filename, args.run_type, solver_keys[isolver],
-                        batch_mult)
-                if mat_format not in datadict[casename]:
-                    datadict[casename][mat_format] = []
-                datadict[casename][mat_format].append(file_dict)
+        datadict = {}
+        for filename in filenames:
+            print("Found " + filename)
+            split_ = filename.split('-')
+            casename = split_[0]
+            batch_mult = int(split_[-1].split('.')[0])
+            print("Case " + casename + " with batch multiplier " + str(batch_mult))
+    
+            if casename not in datadict:
+                datadict[casename] = {}
+            mat_format, file_dict = get_data_from_file(records[filename], solver_keys[isolver],
+                    batch_mult)
+            if mat_format not in datadict[casename]:
+                datadict[casename][mat_format] = []
+            datadict[casename][mat_format].append(file_dict)
 
         print("")
         print("Found " + str(len(datadict)) + " different cases.")
@@ -181,5 +152,6 @@ if __name__ == "__main__":
             for mat_format in datadict[casen]:
                 print("      Found " + str(len(datadict[casen][mat_format])) + " different duplications")
 
-        plot_per_case(datadict, args.log, solver_keys[isolver], opts, "png")
+        specs += get_case_figures(datadict, args.log, solver_keys[isolver], opts, "png")
 
+    render_figures(specs, args.jobs)
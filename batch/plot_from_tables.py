@@ -2,6 +2,8 @@ import argparse
 import pandas as pd
 from matplotlib import pyplot as plt
 
+from build_dataset import read_table
+
 opts = { \
      "marklist" : ['+', '.', '+', '.', 'v', '<', '>', 'd', 'x', '^'],
      "colorlist" : ['g', 'g', 'r', 'r', 'b', 'm', 'pink', 'k', 'c', 'orange'],
@@ -13,32 +15,46 @@ opts = { \
 
 parser = argparse.ArgumentParser(
     description = "Plot timing comparison of batch problem")
-parser.add_argument('files', nargs='+', help = "Files to read from")
+parser.add_argument('files', nargs='+',
+        help = "Tables from create_table_from_json.py or datasets from build_dataset.py")
 parser.add_argument('--log', help = "For log y axis",
         action="store_true")
+parser.add_argument('--case', help = "Only plot this case")
 args = parser.parse_args()
 
 device_dict = { "hip":"Mi100", "cuda":"V100" }
 
+df = pd.concat([read_table(filen) for filen in args.files], ignore_index=True)
+if args.case is not None:
+    df = df[df['case'].astype(str) == args.case]
+groupcols = ['processor', 'case', 'solver', 'matrix_format']
+several_cases = len(df['case'].astype(str).unique()) > 1
+
+# One line for each processor, case, solver and format, in the order they are first found
 i = 0
 plt.close()
-for filen in args.files:
-    df = pd.read_csv(filen, sep=' ')
+for key, linedf in df.groupby(groupcols, observed=True, sort=False):
+    label = str(key[0]) + "," + str(key[2]) + "," + str(key[3])
+    if several_cases:
+        label += "," + str(key[1])
+    linedf = linedf.sort_values('batch_size', kind='stable')
+    # Styles repeat once there are more lines than entries in their lists
+    linetype = opts['linetype'][i % len(opts['linetype'])]
+    color = opts['colorlist'][i % len(opts['colorlist'])]
+    marker = opts['marklist'][i % len(opts['marklist'])]
     if args.log:
-        plt.semilogy(df["batch size"], df["solve time (s)"], lw=opts['linewidth'], \
-                ls=opts['linetype'][i], color=opts['colorlist'][i], \
-                marker=opts['marklist'][i], ms=opts['marksize'], \
+        plt.semilogy(linedf["batch_size"], linedf["apply_time"], lw=opts['linewidth'], \
+                ls=linetype, color=color, \
+                marker=marker, ms=opts['marksize'], \
                 mew=opts['markedgewidth'], \
-                label=df.at[0,"processor"] + "," + df.at[0,"solver type"] + ","
-                    + df.at[0,"matrix format"]
+                label=label
                 )
     else:
-        plt.plot(df["batch size"], df["solve time (s)"], lw=opts['linewidth'], \
-                ls=opts['linetype'][i], color=opts['colorlist'][i], \
-                marker=opts['marklist'][i], ms=opts['marksize'], \
+        plt.plot(linedf["batch_size"], linedf["apply_time"], lw=opts['linewidth'], \
+                ls=linetype, color=color, \
+                marker=marker, ms=opts['marksize'], \
                 mew=opts['markedgewidth'], \
-                label=df.at[0,"processor"] + "," + df.at[0,"solver type"] + ","
-                    + df.at[0,"matrix format"]
+                label=label
                 )
     i += 1
 
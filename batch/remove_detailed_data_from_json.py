@@ -1,17 +1,125 @@
 #! /usr/bin/env python3
 
+'''
+Strips the per-entry data from raw batch solver output in the current
+directory, writing <name>.processed next to each file. Compressed input
+(.json.gz, .json.xz, .json.bz2) is decompressed and parsed as it is read; with
+--compress, the output is compressed too, e.g. <name>.json.processed.xz.
+
+With --format npz, the output is <name>.processed.npz instead: the stripped
+document without its per-entry data, as JSON in the array 'meta', and any kept
+per-entry data as one NumPy array per solver and quantity, named e.g.
+num_iters_0 for the first solver. Each array is written straight into the
+archive, so no text form of the output is ever built. json_loader reads these
+files like JSON ones, so all plotting scripts accept them.
+
+With --keep_iters_res, compressed input is parsed incrementally like for the
+npz output, keeping the first value of each batch entry. The kept arrays are
+written back as {"<index>": [<value>], ...} dicts a block of entries at a time,
+so neither the decompressed text nor the per-entry dicts are held whole.
+'''
+
 import os
+import io
 import json
+import zipfile
 import argparse
+import contextlib
+
+from manifest import get_manifest, get_compression, compression_suffixes, json_patterns
+from json_loader import open_text, read_json, per_entry_keys
+
+# Batch entries of a per-entry array formatted at once when writing JSON
+entries_per_block = 4096
+
+# Zip compression of .npz output for each --compress suffix
+zip_compressions = {'': zipfile.ZIP_STORED, '.gz': zipfile.ZIP_DEFLATED, '.bz2': zipfile.ZIP_BZIP2,
+        '.xz': zipfile.ZIP_LZMA}
+
+def get_output_filename(filename, compression, output_format='json'):
+    ''' <name>.processed for an input file <name>, plain or compressed, with
+    the given compression suffix, or '' for none; or <name>.processed.npz, which
+    is compressed internally.
+    '''
+    basename = filename[:len(filename)-len(get_compression(filename))] + ".processed"
+    if output_format == 'npz':
+        return basename + ".npz"
+    return basename + compression
+
+def write_npz(outdb, run_type, outfilename, compression):
+    ''' Writes a stripped document to an .npz file, moving its per-entry arrays
+    into the archive one at a time.
+    '''
+    import numpy as np
+    section = outdb[0][run_type]
+    with zipfile.ZipFile(outfilename, 'w', compression=zip_compressions[compression],
+            allowZip64=True) as archive:
+        for isolver, key in enumerate(section):
+            for entkey in per_entry_keys:
+                if entkey in section[key]:
+                    values = np.asarray(section[key].pop(entkey))
+                    with archive.open(entkey + "_" + str(isolver) + ".npy", 'w',
+                            force_zip64=True) as member:
+                        np.lib.format.write_array(member, values, allow_pickle=False)
+        with archive.open("meta.npy", 'w') as member:
+            np.lib.format.write_array(member, np.array(json.dumps(outdb)), allow_pickle=False)
+        with archive.open("run_type.npy", 'w') as member:
+            np.lib.format.write_array(member, np.array(run_type), allow_pickle=False)
+
+def format_number(value):
+    ''' A NumPy scalar as JSON does it, including NaN and Infinity.
+    '''
+    if value.dtype.kind in 'iu':
+        return str(int(value))
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '-Infinity' if value < 0 else 'Infinity'
+    return repr(value)
 
-def process_file(filename, solver_del, keep_iters_res):
+def write_json(outdb, outfile):
+    ''' Writes a document like json.dump with indent=4, except that per-entry
+    NumPy arrays are written as {"<index>": [<value>], ...} dicts, a block of
+    entries at a time.
+    '''
+    arrays = {}
+    def replace_arrays(value):
+        if isinstance(value, dict):
+            return {key: replace_arrays(value[key]) for key in value}
+        if isinstance(value, list):
+            return [replace_arrays(item) for item in value]
+        if hasattr(value, 'dtype'):
+            # The encoder writes each string value as one chunk, which is then replaced
+            placeholder = "\0per_entry_" + str(len(arrays))
+            arrays[json.dumps(placeholder)] = value
+            return placeholder
+        return value
+    document = replace_arrays(outdb)
+    for chunk in json.JSONEncoder(indent=4).iterencode(document):
+        if chunk not in arrays:
+            outfile.write(chunk)
+            continue
+        values = arrays[chunk]
+        outfile.write("{")
+        for start in range(0, len(values), entries_per_block):
+            block = values[start:start+entries_per_block]
+            items = ['"' + str(start+i) + '": [' + format_number(block[i]) + ']'
+                    for i in range(len(block))]
+            outfile.write((", " if start > 0 else "") + ", ".join(items))
+        outfile.write("}")
+
+def process_file(filename, solver_del, keep_iters_res, compression='', output_format='json'):
     ''' From the given file, extracts only timing data by default.
     Ignores the norms and iterations by default.
     @param keep_iters_res  If True, keeps true residual norms and iterations.
+    @param compression  Suffix of the compression of the output, or '' for none.
+    @param output_format  'json' or 'npz'.
+    Returns the number of bytes read and written.
     '''
-    infile = open(filename, 'r')
-    db = json.load(infile)
-    infile.close()
+    # Arrays for the npz output and for compressed input; plain JSON files are
+    # parsed without NumPy, and their per-entry dicts are kept whole
+    db = read_json(filename, stream=(output_format == 'npz'))
     outdb = []
     outdb.append({})
     run_type = 'batch_solver'
@@ -38,25 +146,87 @@ def process_file(filename, solver_del, keep_iters_res):
         if keep_iters_res:
             outsec['num_iters'] = indb[key]['num_iters']
             outsec['residual_norm'] = indb[key]['residual_norm']
-    outfilename = filename + ".processed"
-    outfile = open(outfilename, 'w')
-    outstring = json.dumps(outdb, indent=4)
-    outfile.write(outstring)
-    outfile.close()
+    outfilename = get_output_filename(filename, compression, output_format)
+    if output_format == 'npz':
+        write_npz(outdb, run_type, outfilename, compression)
+    else:
+        with open_text(outfilename, 'w') as outfile:
+            write_json(outdb, outfile)
+    return os.path.getsize(filename), os.path.getsize(outfilename)
+
+def process_file_isolated(filename, solver_del, keep_iters_res, compression, output_format):
+    ''' Runs process_file, capturing its output and any error so that one bad
+    file does not stop the others. Returns (bytes in, bytes out, output, error).
+    '''
+    log = io.StringIO()
+    bytes_in = 0
+    bytes_out = 0
+    error = None
+    with contextlib.redirect_stdout(log):
+        try:
+            bytes_in, bytes_out = process_file(filename, solver_del, keep_iters_res,
+                    compression, output_format)
+        except Exception as e:
+            error = type(e).__name__ + ": " + str(e)
+    return bytes_in, bytes_out, log.getvalue(), error
+
+def map_in_processes(function, jobs, *iterables):
+    ''' Like map, on a pool of jobs processes. One job runs in this process,
+    which saves starting a pool.
+    '''
+    if jobs == 1:
+        yield from map(function, *iterables)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(function, *iterables)
+
+def process_files(filenames, solver_del, keep_iters_res, jobs, compression='', output_format='json'):
+    ''' Processes the files on a pool of jobs processes, reporting progress in
+    the order of filenames. Returns the list of files that failed.
+    '''
+    failed = []
+    total_in = 0
+    total_out = 0
+    nfiles = len(filenames)
+    results = map_in_processes(process_file_isolated, jobs, filenames, [solver_del]*nfiles,
+            [keep_iters_res]*nfiles, [compression]*nfiles, [output_format]*nfiles)
+    for ifile, result in enumerate(results):
+        bytes_in, bytes_out, output, error = result
+        print("[" + str(ifile+1) + "/" + str(nfiles) + "] Processing " + filenames[ifile])
+        print(output, end='')
+        if error is not None:
+            print("  FAILED: " + error)
+            failed.append(filenames[ifile])
+            continue
+        total_in += bytes_in
+        total_out += bytes_out
+    print("Processed " + str(nfiles - len(failed)) + " of " + str(nfiles) + " files: "
+            + str(total_in) + " bytes in, " + str(total_out) + " bytes out")
+    if total_out > 0:
+        print("Size reduction factor " + str(round(total_in/total_out, 2)))
+    if len(failed) > 0:
+        print("Failed files: " + str(failed))
+    return failed
 
 if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(
         description = "Plot timing comparison of for different types of runs")
     parser.add_argument("--delete_solver", help = "name of the solver to delete")
+    parser.add_argument("--keep_iters_res", action="store_true",
+            help = "keep the per-entry iteration counts and residual norms")
+    parser.add_argument("--jobs", type=int, default=1, help = "number of files to process in parallel")
+    parser.add_argument("--compress", choices=[suffix[1:] for suffix in compression_suffixes],
+            help = "compress the output with gzip (gz), xz or bzip2 (bz2)")
+    parser.add_argument("--format", default = "json", choices=['json', 'npz'],
+            help = "write indented JSON, or arrays in an .npz file")
     args = parser.parse_args()
     curdir = os.getcwd()
+    compression = "." + args.compress if args.compress is not None else ''
     
-    for file in os.listdir(curdir):
-        filename = os.fsdecode(file)
-        if filename.endswith(".json"):
-            print("Processing " + filename)
-            process_file(filename, args.delete_solver, False)
-        else:
-            continue
-    
+    filenames = get_manifest(curdir).select(json_patterns, recursive=False, kind='raw')
+    failed = process_files(filenames, args.delete_solver, args.keep_iters_res, args.jobs, compression,
+            args.format)
+    if len(failed) > 0:
+        exit(1)
@@ -0,0 +1,214 @@
+'''
+Renders figures from plain, picklable descriptions, either one after another or
+on a pool of worker processes.
+
+A figure spec is a dict of plain data (see figure_spec) describing the lines,
+labels, limits, grid and output file of one figure. Scripts build one spec per
+case and hand the whole list to render_figures, which draws them on the headless
+Agg backend.
+
+Specs that differ only in their data, limits, title and file name share a
+layout. render_figures builds one FigureTemplate per layout with its axes, lines,
+legend, labels and grid. For every further case of that layout it only swaps in
+the new line data, error bars, limits and title before saving. Only a few templates are kept
+open at a time, so memory does not grow with the number of cases. The files are
+byte-identical to drawing every spec in a fresh figure (render_figure), and to
+rendering with any number of workers.
+
+Drawing leaves reference cycles behind, about 1 MB per figure with log axes,
+mostly pyparsing exceptions from parsing mathtext tick labels, whose tracebacks
+hold the frames of the parser. Fresh figures allocate enough to trigger Python's
+full collections regularly; rendering from templates does not, and memory then
+swung by some 35 MB between rare full collections. render_with_templates
+therefore collects after every figure. The objects that exist before rendering
+starts are frozen out of these collections, which leaves about 6 ms per figure.
+'''
+
+import gc
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Number of figure templates kept open by render_figures
+max_templates = 4
+
+# Error bars are drawn just below the lines, so that they are drawn in the same
+# order whether a figure is fresh or a template
+errorbar_zorder = 1.9
+errorbar_capsize = 2
+
+def line_spec(plotter, x, y, opts, iline, label, yerr=None):
+    ''' One line in the style given by opts, drawn with plt.<plotter> ('plot',
+    'semilogy', ...). x may be None to plot against the index. yerr, if given,
+    is a (2, len(y)) array of distances below and above y for error bars.
+    '''
+    kwargs = {'lw': opts['linewidth'], 'ls': opts['linetype'][iline],
+            'color': opts['colorlist'][iline], 'marker': opts['marklist'][iline],
+            'ms': opts['marksize'], 'mew': opts['markedgewidth'], 'label': label}
+    return {'plotter': plotter, 'x': x, 'y': y, 'kwargs': kwargs, 'yerr': yerr}
+
+def figure_spec(filename, lines, xlabel, ylabel, rcparams={}, legend={'loc': 'best'},
+        tight_layout=False, ylim=None, grid=[(('on',), {})], dpi=200, title=None):
+    ''' Describes one figure. grid is a list of (args, kwargs) for successive
+    plt.grid calls; legend holds the plt.legend kwargs, or None for no legend.
+    '''
+    return {'filename': filename, 'lines': lines, 'xlabel': xlabel, 'ylabel': ylabel,
+            'rcparams': rcparams, 'legend': legend, 'tight_layout': tight_layout,
+            'ylim': ylim, 'grid': grid, 'dpi': dpi, 'title': title}
+
+def get_line_data(line):
+    if line['x'] is None:
+        return np.arange(len(line['y'])), line['y']
+    return line['x'], line['y']
+
+def draw_errorbars(ax, line):
+    ''' Error bars of a line in its colour and width, or None if it has none.
+    '''
+    if line.get('yerr') is None:
+        return None
+    x, y = get_line_data(line)
+    return ax.errorbar(x, y, yerr=line['yerr'], fmt='none', ecolor=line['kwargs']['color'],
+            elinewidth=line['kwargs']['lw'], capsize=errorbar_capsize, zorder=errorbar_zorder,
+            label='_nolegend_')
+
+def render_figure(spec):
+    plt.close()
+    plt.rcParams.update(spec['rcparams'])
+    for line in spec['lines']:
+        plotter = getattr(plt, line['plotter'])
+        if line['x'] is None:
+            plotter(line['y'], **line['kwargs'])
+        else:
+            plotter(line['x'], line['y'], **line['kwargs'])
+        draw_errorbars(plt.gca(), line)
+    if spec['legend'] is not None:
+        plt.legend(**spec['legend'])
+    if spec['tight_layout']:
+        plt.tight_layout()
+    plt.xlabel(spec['xlabel'])
+    plt.ylabel(spec['ylabel'])
+    if spec['ylim'] is not None:
+        plt.ylim(spec['ylim'][0], spec['ylim'][1])
+    if spec['title'] is not None:
+        plt.title(spec['title'])
+    for args, kwargs in spec['grid']:
+        plt.grid(*args, **kwargs)
+    plt.savefig(spec['filename'], dpi=spec['dpi'], bbox_inches='tight')
+    plt.close()
+    return spec['filename']
+
+def get_layout_key(spec):
+    ''' Everything about a spec except its data, limits, title and file name.
+    '''
+    lines = [(line['plotter'], line['x'] is None, line.get('yerr') is None,
+            sorted(line['kwargs'].items())) for line in spec['lines']]
+    return repr((lines, spec['xlabel'], spec['ylabel'], sorted(spec['rcparams'].items()),
+            spec['legend'], spec['tight_layout'], spec['grid'], spec['dpi']))
+
+class FigureTemplate:
+    ''' A figure drawn once for a layout and then redrawn for each case of that
+    layout by updating its line data, limits and title. Mirrors render_figure
+    step by step, so that both write the same file for a spec.
+    '''
+    def __init__(self, spec):
+        plt.rcParams.update(spec['rcparams'])
+        self.fig = plt.figure()
+        self.ax = self.fig.gca()
+        subplotpars = self.fig.subplotpars
+        self.default_subplotpars = {'left': subplotpars.left, 'right': subplotpars.right,
+                'bottom': subplotpars.bottom, 'top': subplotpars.top}
+        self.lines = []
+        self.errorbars = []
+        for line in spec['lines']:
+            plotter = getattr(self.ax, line['plotter'])
+            x, y = get_line_data(line)
+            self.lines.append(plotter(x, y, **line['kwargs'])[0])
+            self.errorbars.append(draw_errorbars(self.ax, line))
+        if spec['legend'] is not None:
+            self.ax.legend(**spec['legend'])
+        self.tight_layout = spec['tight_layout']
+        self.ax.set_xlabel(spec['xlabel'])
+        self.ax.set_ylabel(spec['ylabel'])
+        self.title = self.ax.set_title("")
+        for args, kwargs in spec['grid']:
+            self.ax.grid(*args, **kwargs)
+
+    def render(self, spec):
+        # Tick labels are created while drawing, from the rcParams in effect then
+        plt.rcParams.update(spec['rcparams'])
+        for artist, line in zip(self.lines, spec['lines']):
+            artist.set_data(*get_line_data(line))
+        # Error bars are collections with one segment per point, so draw them anew
+        for iline in range(len(self.errorbars)):
+            if self.errorbars[iline] is not None:
+                self.errorbars[iline].remove()
+                self.errorbars[iline] = draw_errorbars(self.ax, spec['lines'][iline])
+        self.ax.set_autoscale_on(True)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        if self.tight_layout:
+            # render_figure lays the figure out before setting labels, limits and title
+            labels = [self.ax.xaxis.label, self.ax.yaxis.label, self.title]
+            for label in labels:
+                label.set_visible(False)
+            # tight_layout starts from the current subplot parameters, so start from
+            # the defaults like a fresh figure does
+            self.fig.subplots_adjust(**self.default_subplotpars)
+            self.fig.tight_layout()
+            for label in labels:
+                label.set_visible(True)
+        if spec['ylim'] is not None:
+            self.ax.set_ylim(spec['ylim'][0], spec['ylim'][1])
+        self.title.set_text(spec['title'] if spec['title'] is not None else "")
+        self.fig.savefig(spec['filename'], dpi=spec['dpi'], bbox_inches='tight')
+        return spec['filename']
+
+    def close(self):
+        plt.close(self.fig)
+
+def iter_render_with_templates(specs):
+    ''' Renders specs in order, reusing one figure per layout, and yields the
+    name of each file once written. At most max_templates figures are open at
+    any time.
+    '''
+    templates = {}
+    # Modules, caches and specs are left out of the collections after each figure
+    gc.collect()
+    gc.freeze()
+    try:
+        for spec in specs:
+            key = get_layout_key(spec)
+            if key not in templates:
+                if len(templates) >= max_templates:
+                    # Dicts keep insertion order; close the template created first
+                    oldest = next(iter(templates))
+                    templates.pop(oldest).close()
+                templates[key] = FigureTemplate(spec)
+            filename = templates[key].render(spec)
+            gc.collect()
+            yield filename
+    finally:
+        for key in templates:
+            templates[key].close()
+        gc.unfreeze()
+
+def render_with_templates(specs):
+    ''' Renders specs in order like iter_render_with_templates and returns the
+    names of the files written.
+    '''
+    return list(iter_render_with_templates(specs))
+
+def render_figures(specs, jobs=1):
+    ''' Renders all figure specs, on jobs worker processes if jobs > 1, each of
+    which renders a contiguous share of the specs with its own templates.
+    Returns the names of the files written, in the order of specs.
+    '''
+    if jobs <= 1 or len(specs) <= 1:
+        return render_with_templates(specs)
+    chunk = -(-len(specs) // jobs)
+    chunks = [specs[i:i+chunk] for i in range(0, len(specs), chunk)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return [filename for filenames in executor.map(render_with_templates, chunks)
+                for filename in filenames]
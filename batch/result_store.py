@@ -0,0 +1,207 @@
+#! /usr/bin/env python3
+
+'''
+Persistent SQLite database of benchmark runs, filled incrementally.
+
+'ingest' scans a result tree and adds the runs of every JSON file not yet in
+the database, with the same columns as build_dataset.py. Files are recognised
+by content hash, so a file copied or moved elsewhere is not ingested twice.
+An unchanged path (same size and mtime) is skipped without hashing it, and the
+runs of a file rewritten in place replace those of its old content. Each group
+of files goes in as one transaction, with all its runs in one batched insert.
+
+'query' selects runs by case, solver, matrix format, processor and batch size,
+which are indexed, without reading any JSON, e.g.
+    result_store.py query --matrix_format csr --processor skylake --min_batch_size 10000
+'''
+
+import os
+import time
+import sqlite3
+import argparse
+
+from json_loader import load_file
+from arguments import add_tree_arguments
+from extract_cache import hash_file
+from run_columns import find_result_files, get_run_columns, get_file_processor, dataset_columns, \
+        numeric_columns
+
+default_db_filename = "results.sqlite"
+
+# Files ingested per transaction
+files_per_transaction = 256
+
+# The 'case' column of the dataset, which is an SQL keyword
+db_columns = ['case_name' if column == 'case' else column for column in dataset_columns]
+
+schema = [
+    '''CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL,
+        path TEXT NOT NULL, size INTEGER, mtime INTEGER, ingested REAL)''',
+    '''CREATE TABLE IF NOT EXISTS paths (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER,
+        file_id INTEGER REFERENCES files(id))''',
+    '''CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, file_id INTEGER REFERENCES files(id),
+        processor TEXT, case_name TEXT, solver TEXT, matrix_format TEXT, tolerance_type TEXT,
+        file TEXT, batch_size INTEGER, batch_multiplier INTEGER, apply_time REAL, total_time REAL,
+        iters_min REAL, iters_mean REAL, iters_max REAL)''',
+    '''CREATE INDEX IF NOT EXISTS runs_key ON runs (case_name, solver, matrix_format, processor,
+        batch_size)''',
+    '''CREATE INDEX IF NOT EXISTS runs_format ON runs (matrix_format, processor, batch_size)''',
+]
+
+# Query options: (column, SQL comparison)
+query_filters = {'case': ('case_name', '='), 'solver': ('solver', '='),
+        'matrix_format': ('matrix_format', '='), 'processor': ('processor', '='),
+        'min_batch_size': ('batch_size', '>='), 'max_batch_size': ('batch_size', '<=')}
+
+def to_sql_value(value):
+    ''' SQLite takes Python numbers, not NumPy ones; NaN is stored as NULL.
+    '''
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+class ResultStore:
+    def __init__(self, filename=default_db_filename):
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            for statement in schema:
+                self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def is_known_path(self, path, st):
+        row = self.conn.execute("SELECT size, mtime FROM paths WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns
+
+    def get_file_id(self, filehash):
+        row = self.conn.execute("SELECT id FROM files WHERE hash = ?", (filehash,)).fetchone()
+        return None if row is None else row[0]
+
+    def remove_unreferenced_file(self, file_id):
+        ''' Deletes a file's content and runs once no path holds that content.
+        '''
+        if self.conn.execute("SELECT 1 FROM paths WHERE file_id = ?", (file_id,)).fetchone() is None:
+            self.conn.execute("DELETE FROM runs WHERE file_id = ?", (file_id,))
+            self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def ingest_file(self, rootdir, path, run_type, processor, tolerance_type):
+        ''' Reads one file unless its content is already in the database, and
+        points its path at that content; the runs of the path's previous content
+        are deleted if no other path has it. Returns the rows of runs to insert.
+        Call inside a transaction.
+        '''
+        fullpath = os.path.join(rootdir, path)
+        st = os.stat(fullpath)
+        filehash = hash_file(fullpath)
+        file_id = self.get_file_id(filehash)
+        rows = []
+        if file_id is None:
+            record = load_file(fullpath, run_type)
+            columns = get_run_columns(record, path, processor, tolerance_type)
+            cursor = self.conn.execute("INSERT INTO files (hash, path, size, mtime, ingested)"
+                    + " VALUES (?, ?, ?, ?, ?)", (filehash, path, st.st_size, st.st_mtime_ns, time.time()))
+            file_id = cursor.lastrowid
+            rows = [[file_id] + [to_sql_value(columns[column][i]) for column in dataset_columns]
+                    for i in range(len(record['solver_keys']))]
+        old = self.conn.execute("SELECT file_id FROM paths WHERE path = ?", (path,)).fetchone()
+        self.conn.execute("INSERT OR REPLACE INTO paths (path, size, mtime, file_id) VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, file_id))
+        if old is not None and old[0] != file_id:
+            self.remove_unreferenced_file(old[0])
+        return rows
+
+    def insert_runs(self, rows):
+        self.conn.executemany("INSERT INTO runs (file_id, " + ", ".join(db_columns) + ") VALUES ("
+                + ", ".join(["?"]*(len(db_columns)+1)) + ")", rows)
+
+    def ingest_tree(self, rootdir, run_type, processor, processor_from_dir=False,
+            tolerance_type='relative'):
+        ''' Ingests all new JSON files under rootdir. Returns the numbers of files
+        added, skipped and failed, and of runs added.
+        '''
+        paths = find_result_files(rootdir)
+        counts = {'files': 0, 'skipped': 0, 'failed': 0, 'runs': 0}
+        for start in range(0, len(paths), files_per_transaction):
+            with self.conn:
+                rows = []
+                for path in paths[start:start+files_per_transaction]:
+                    if self.is_known_path(path, os.stat(os.path.join(rootdir, path))):
+                        counts['skipped'] += 1
+                        continue
+                    try:
+                        filerows = self.ingest_file(rootdir, path, run_type,
+                                get_file_processor(path, processor, processor_from_dir), tolerance_type)
+                    except Exception as e:
+                        print("Skipping " + path + ": " + str(e))
+                        counts['failed'] += 1
+                        continue
+                    if len(filerows) > 0:
+                        counts['files'] += 1
+                        counts['runs'] += len(filerows)
+                        rows.extend(filerows)
+                    else:
+                        counts['skipped'] += 1
+                self.insert_runs(rows)
+        return counts
+
+    def query(self, columns=db_columns, **filters):
+        ''' Returns the runs matching the given query_filters as a list of tuples
+        of the given columns.
+        '''
+        conditions = []
+        values = []
+        for key in filters:
+            if filters[key] is None:
+                continue
+            column, comparison = query_filters[key]
+            conditions.append(column + " " + comparison + " ?")
+            values.append(filters[key])
+        sql = "SELECT " + ", ".join(columns) + " FROM runs"
+        if len(conditions) > 0:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY case_name, solver, matrix_format, processor, batch_size"
+        return self.conn.execute(sql, values).fetchall()
+
+    def query_dataframe(self, **filters):
+        ''' The runs matching the given query_filters as a DataFrame with the
+        columns of build_dataset.py.
+        '''
+        import pandas as pd
+        df = pd.DataFrame(self.query(**filters), columns=dataset_columns)
+        for column in numeric_columns:
+            df[column] = df[column].astype(numeric_columns[column])
+        return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Incremental SQLite database of benchmark runs")
+    parser.add_argument('--db', default = default_db_filename, help = "Database file")
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+    ingest = subparsers.add_parser('ingest', help = "Add the runs of new JSON files under a directory")
+    add_tree_arguments(ingest)
+    query = subparsers.add_parser('query', help = "Print the runs matching all given filters")
+    for key in query_filters:
+        query.add_argument('--' + key, type = int if 'batch_size' in key else str)
+    args = parser.parse_args()
+
+    store = ResultStore(args.db)
+    if args.command == 'ingest':
+        start = time.perf_counter()
+        counts = store.ingest_tree(args.dir, args.run_type, args.processor, args.processor_from_dir,
+                args.norm_type)
+        print("Added " + str(counts['runs']) + " runs from " + str(counts['files']) + " files, skipped "
+                + str(counts['skipped']) + " known files, " + str(counts['failed']) + " failed, in "
+                + str(round(time.perf_counter() - start, 3)) + " s")
+    else:
+        start = time.perf_counter()
+        rows = store.query(**{key: getattr(args, key) for key in query_filters})
+        elapsed = time.perf_counter() - start
+        print(" ".join(db_columns))
+        for row in rows:
+            print(" ".join(str(value) for value in row))
+        print(str(len(rows)) + " runs in " + str(round(1000*elapsed, 2)) + " ms")
+    store.close()
@@ -0,0 +1,65 @@
+'''
+The columns of one row per solver run, as stored by build_dataset.py and
+result_store.py, and how they are read from a file's record. Kept apart from
+build_dataset.py so that tools writing rows do not have to load pandas, and
+NumPy is only imported once rows are built.
+'''
+
+import os
+
+from manifest import get_manifest, get_case_and_multiplier
+
+categorical_columns = ['processor', 'case', 'solver', 'matrix_format', 'tolerance_type', 'file']
+numeric_columns = {'batch_size': 'int64', 'batch_multiplier': 'int64', 'apply_time': 'float64',
+        'total_time': 'float64', 'iters_min': 'float64', 'iters_mean': 'float64',
+        'iters_max': 'float64'}
+dataset_columns = categorical_columns + list(numeric_columns)
+
+def find_result_files(rootdir, recursive=True):
+    ''' Relative paths of the benchmark files under rootdir, or only in it if not
+    recursive, one per run, sorted, from the tree's manifest. Hidden directories,
+    such as caches, are skipped.
+    '''
+    return get_manifest(rootdir).select_results(recursive=recursive)
+
+def get_iteration_stats(record):
+    ''' Per-solver minimum, mean and maximum iteration count, NaN without detailed output.
+    '''
+    import numpy as np
+    nsolvers = len(record['solver_keys'])
+    if record['num_iters'] is None or record['num_iters'].shape[1] == 0:
+        nan = np.full(nsolvers, np.nan)
+        return nan, nan, nan
+    iters = record['num_iters']
+    return iters.min(axis=1).astype(float), iters.mean(axis=1), iters.max(axis=1).astype(float)
+
+def get_run_columns(record, path, processor, tolerance_type):
+    ''' The dataset columns of the runs of one file, as lists or arrays with one
+    entry per solver.
+    '''
+    import numpy as np
+    nsolvers = len(record['solver_keys'])
+    casename, batch_mult = get_case_and_multiplier(path)
+    columns = {}
+    columns['processor'] = [processor]*nsolvers
+    columns['case'] = [casename]*nsolvers
+    columns['solver'] = record['solver_keys']
+    columns['matrix_format'] = record['matrix_formats']
+    columns['tolerance_type'] = [tolerance_type]*nsolvers
+    columns['file'] = [path]*nsolvers
+    columns['batch_size'] = record['batch_sizes']
+    columns['batch_multiplier'] = np.full(nsolvers, batch_mult)
+    columns['apply_time'] = record['apply_kernel_times']
+    # The whole apply, or for runs without one (such as SpMV) the run's time
+    columns['total_time'] = np.where(np.isnan(record['apply_times']), record['times'],
+            record['apply_times'])
+    columns['iters_min'], columns['iters_mean'], columns['iters_max'] = get_iteration_stats(record)
+    return columns
+
+def get_file_processor(path, processor, processor_from_dir):
+    ''' With processor_from_dir, the first directory of a relative path names the
+    processor of the file; otherwise, and for files at the top, it is processor.
+    '''
+    if processor_from_dir and os.sep in path:
+        return path.split(os.sep)[0]
+    return processor
@@ -0,0 +1,118 @@
+#! /usr/bin/env python3
+
+'''
+Statistics of repeated runs: runs with the same case, solver, matrix format,
+processor and batch size form a group, and each group gets its number of runs,
+median, minimum, quartiles, interquartile range and a bootstrap confidence
+interval of the median.
+
+The bootstrap is vectorized over groups. Groups with the same number of runs n
+are stacked into one (groups, n) array with sorted rows, and all of them are
+resampled with one (resamples, n) index matrix. Sorting each row of the index
+matrix keeps every resample sorted, so its median is just its middle element(s)
+and no resample is ever built or sorted.
+
+Reads datasets of build_dataset.py or tables of create_table_from_json.py, e.g.
+    run_stats.py results.npz --output run-stats.txt
+'''
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from build_dataset import read_table
+
+group_columns = ['case', 'solver', 'matrix_format', 'processor', 'batch_size']
+stats_columns = ['runs', 'median', 'min', 'q1', 'q3', 'iqr', 'ci_low', 'ci_high']
+
+# Largest number of resampled medians held at once
+max_bootstrap_values = 1 << 24
+
+def get_sorted_groups(df, column, keys):
+    ''' Returns the key columns of each group, the values of all groups sorted by
+    group and then by value, and the offset of each group in them.
+    '''
+    grouped = df.groupby(keys, observed=True, sort=True)
+    group_ids = grouped.ngroup().to_numpy()
+    values = df[column].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    group_ids = group_ids[valid]
+    values = values[valid]
+    order = np.lexsort((values, group_ids))
+    counts = np.bincount(group_ids, minlength=grouped.ngroups)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    keysdf = grouped.size().reset_index()[keys]
+    return keysdf, values[order], offsets
+
+def bootstrap_median_ci(stacked, resamples, confidence, rng):
+    ''' Percentile bootstrap interval of the median of each row of stacked, an
+    array of groups with the same number of runs whose rows are sorted.
+    '''
+    ngroups, n = stacked.shape
+    if n == 1:
+        return stacked[:, 0].copy(), stacked[:, 0].copy()
+    indices = np.sort(rng.integers(0, n, size=(resamples, n)), axis=1)
+    lower = indices[:, (n-1)//2]
+    upper = indices[:, n//2]
+    alpha = (1.0 - confidence)/2
+    ci = np.empty((2, ngroups))
+    chunk = max(1, max_bootstrap_values // resamples)
+    for start in range(0, ngroups, chunk):
+        rows = stacked[start:start+chunk]
+        medians = 0.5*(rows[:, lower] + rows[:, upper])
+        ci[:, start:start+chunk] = np.quantile(medians, [alpha, 1.0 - alpha], axis=1)
+    return ci[0], ci[1]
+
+def compute_stats(df, column='apply_time', resamples=1000, confidence=0.95, seed=0):
+    ''' Returns a DataFrame with one row per group of repeated runs, with the
+    group_columns present in df and the stats_columns of the given column.
+    '''
+    keys = [key for key in group_columns if key in df.columns]
+    keysdf, values, offsets = get_sorted_groups(df, column, keys)
+    counts = np.diff(offsets)
+    stats = {}
+    for name in stats_columns:
+        stats[name] = np.full(len(counts), np.nan)
+    stats['runs'] = counts
+    rng = np.random.default_rng(seed)
+    for n in np.unique(counts):
+        if n == 0:
+            continue
+        groups = np.nonzero(counts == n)[0]
+        stacked = values[offsets[groups][:, None] + np.arange(n)]
+        stats['median'][groups] = np.median(stacked, axis=1)
+        stats['min'][groups] = stacked[:, 0]
+        stats['q1'][groups], stats['q3'][groups] = np.quantile(stacked, [0.25, 0.75], axis=1)
+        stats['ci_low'][groups], stats['ci_high'][groups] = bootstrap_median_ci(stacked, resamples,
+                confidence, rng)
+    stats['iqr'] = stats['q3'] - stats['q1']
+    for name in stats_columns:
+        keysdf[name] = stats[name]
+    return keysdf
+
+def get_errors(stats):
+    ''' Distances of the confidence interval below and above the median, as
+    taken by plt.errorbar.
+    '''
+    return np.array([stats['median'] - stats['ci_low'], stats['ci_high'] - stats['median']])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Median, quartiles and bootstrap confidence intervals of repeated runs")
+    parser.add_argument('files', nargs='+',
+            help = "Datasets from build_dataset.py or tables from create_table_from_json.py")
+    parser.add_argument('--column', default = "apply_time", help = "Timing column")
+    parser.add_argument('--resamples', type=int, default=1000, help = "Number of bootstrap resamples")
+    parser.add_argument('--confidence', type=float, default=0.95, help = "Confidence level")
+    parser.add_argument('--seed', type=int, default=0, help = "Seed of the bootstrap")
+    parser.add_argument('--output', default = "run-stats.txt", help = "Output table")
+    args = parser.parse_args()
+
+    df = pd.concat([read_table(filen) for filen in args.files], ignore_index=True)
+    start = time.perf_counter()
+    stats = compute_stats(df, args.column, args.resamples, args.confidence, args.seed)
+    elapsed = time.perf_counter() - start
+    stats.to_csv(args.output, sep=' ', index=False)
+    print("Wrote statistics of " + str(len(stats)) + " groups of " + str(len(df)) + " runs to "
+            + args.output + " in " + str(round(elapsed, 3)) + " s")
@@ -0,0 +1,155 @@
+#! /usr/bin/env python3
+
+'''
+Fits how the time of a batch solve grows with the batch size, for every case,
+solver, matrix format and processor in a dataset, and reports where the device
+saturates and what larger batches would take.
+
+Each curve is fitted with
+    time(N) = floor                           for N <= N_s
+    time(N) = floor + per_matrix*(N - N_s)    for N > N_s
+a floor while the device is not yet full, then a constant cost per further
+matrix. Equivalently, above N_s time = overhead + per_matrix*N. The breakpoint
+N_s is one of the measured batch sizes, or none (a straight line) if the data
+do not justify a floor by the Bayesian information criterion. For each curve
+and each candidate breakpoint the model is linear in its two coefficients, so
+all curves and breakpoints are fitted at once by closed-form weighted least
+squares on relative errors.
+
+Reported per curve are the saturated throughput 1/per_matrix in matrices per
+second, the batch size at which throughput reaches 90% of it, and the
+projected times of the batch sizes given with --project, e.g.
+    scaling_model.py results.npz --project 100000 1000000
+Repeated runs of a batch size are reduced to their median first.
+'''
+
+import argparse
+import numpy as np
+import pandas as pd
+
+from build_dataset import read_table
+
+curve_columns = ['case', 'solver', 'matrix_format', 'processor']
+
+# Fraction of the saturated throughput for which the batch size is reported
+saturation_fraction = 0.9
+
+def get_curves(df, column, keys):
+    ''' Returns the key columns of each curve and padded (curves, points) arrays
+    of batch sizes and median times, ascending in batch size, with a mask of the
+    points present.
+    '''
+    medians = df.groupby(keys + ['batch_size'], observed=True, sort=True)[column].median()
+    medians = medians.dropna().reset_index()
+    curve_ids = medians.groupby(keys, observed=True, sort=True).ngroup().to_numpy()
+    counts = np.bincount(curve_ids)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    positions = np.arange(len(medians)) - offsets[curve_ids]
+    x = np.zeros((len(counts), counts.max()))
+    y = np.ones((len(counts), counts.max()))
+    mask = np.zeros((len(counts), counts.max()), dtype=bool)
+    x[curve_ids, positions] = medians['batch_size'].to_numpy(dtype=float)
+    y[curve_ids, positions] = medians[column].to_numpy(dtype=float)
+    mask[curve_ids, positions] = True
+    keysdf = medians[keys].iloc[offsets[:-1]].reset_index(drop=True)
+    return keysdf, x, y, mask
+
+def fit_curves(x, y, mask):
+    ''' Fits the model to all curves; returns per curve the floor, the cost per
+    matrix and the breakpoint, and the relative RMS error of the fit. Candidate
+    breakpoints are the curve's batch sizes; the first is a straight line.
+    '''
+    npoints = mask.sum(axis=1)
+    # Relative errors, as times span orders of magnitude
+    w = np.where(mask, 1.0/(y*y), 0.0)[:, None, :]
+    # z[curve, candidate, point]: batch size beyond the candidate breakpoint
+    z = np.maximum(x[:, None, :] - x[:, :, None], 0.0)
+    sw = w.sum(axis=2)
+    sz = (w*z).sum(axis=2)
+    szz = (w*z*z).sum(axis=2)
+    sy = (w*y[:, None, :]).sum(axis=2)
+    szy = (w*z*y[:, None, :]).sum(axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_matrix = (sw*szy - sz*sy)/(sw*szz - sz*sz)
+        floor = (sy - per_matrix*sz)/sw
+        sse = (w*(floor[:, :, None] + per_matrix[:, :, None]*z - y[:, None, :])**2).sum(axis=2)
+        # Bayesian information criterion, with the breakpoint as a third parameter
+        nparams = np.where(np.arange(x.shape[1]) == 0, 2, 3)
+        bic = npoints[:, None]*np.log(np.maximum(sse, 1e-300)/npoints[:, None]) \
+                + nparams*np.log(npoints[:, None])
+    # A breakpoint needs at least two points above it, and time must grow
+    above = np.cumsum(mask[:, ::-1], axis=1)[:, ::-1] - 1
+    valid = mask & (above >= 2) & (per_matrix > 0) & np.isfinite(per_matrix)
+    # Curves of two points are straight lines
+    valid[:, 0] = np.isfinite(per_matrix[:, 0])
+    bic = np.where(valid, bic, np.inf)
+    best = np.argmin(bic, axis=1)
+    rows = np.arange(x.shape[0])
+    fit = {'floor': floor[rows, best], 'per_matrix': per_matrix[rows, best],
+            'breakpoint': x[rows, best], 'rel_rms': np.sqrt(sse[rows, best]/npoints)}
+    # A straight line has no floor: move its breakpoint to a batch size of 0
+    line = best == 0
+    fit['floor'][line] -= fit['per_matrix'][line]*fit['breakpoint'][line]
+    fit['breakpoint'][line] = 0.0
+    return fit
+
+def predict(fit, batch_sizes):
+    ''' Projected times of the given batch sizes, as a (curves, sizes) array.
+    '''
+    batch_sizes = np.asarray(batch_sizes, dtype=float)
+    return fit['floor'][:, None] + fit['per_matrix'][:, None]*np.maximum(batch_sizes[None, :]
+            - fit['breakpoint'][:, None], 0.0)
+
+def get_saturation(fit, fraction=saturation_fraction):
+    ''' Saturated throughput in matrices per second, and the smallest batch size
+    reaching the given fraction of it.
+    '''
+    floor = fit['floor']
+    per_matrix = fit['per_matrix']
+    breakpoint = fit['breakpoint']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        peak = np.where(per_matrix > 0, 1.0/per_matrix, np.nan)
+        # On the floor, throughput is N/floor; above the breakpoint N/(overhead + per_matrix*N)
+        on_floor = fraction*floor/per_matrix
+        overhead = floor - per_matrix*breakpoint
+        above = np.maximum(fraction/(1.0 - fraction)*overhead/per_matrix, breakpoint)
+        batch = np.where(on_floor <= breakpoint, on_floor, above)
+    return peak, np.where(per_matrix > 0, batch, np.nan)
+
+def fit_dataset(df, column='apply_time', project=[]):
+    ''' One row per curve with its fitted model, saturation and projected times.
+    '''
+    keys = [key for key in curve_columns if key in df.columns]
+    keysdf, x, y, mask = get_curves(df, column, keys)
+    fit = fit_curves(x, y, mask)
+    peak, batch = get_saturation(fit)
+    keysdf['points'] = mask.sum(axis=1)
+    keysdf['overhead'] = fit['floor'] - fit['per_matrix']*fit['breakpoint']
+    keysdf['floor'] = fit['floor']
+    keysdf['saturation_batch'] = fit['breakpoint']
+    keysdf['per_matrix'] = fit['per_matrix']
+    keysdf['peak_matrices_per_s'] = peak
+    keysdf['batch_' + str(int(100*saturation_fraction)) + '_percent'] = batch
+    keysdf['rel_rms'] = fit['rel_rms']
+    projected = predict(fit, project)
+    for i in range(len(project)):
+        keysdf['time_' + str(project[i])] = projected[:, i]
+    return keysdf
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Fit overhead, cost per matrix and saturation of time against batch size")
+    parser.add_argument('files', nargs='+',
+            help = "Datasets from build_dataset.py or tables from create_table_from_json.py")
+    parser.add_argument('--column', default = "apply_time", help = "Timing column")
+    parser.add_argument('--project', type=int, nargs='*', default=[],
+            help = "Batch sizes to project times for")
+    parser.add_argument('--output', default = "scaling-model.txt", help = "Output table")
+    args = parser.parse_args()
+
+    df = pd.concat([read_table(filen) for filen in args.files], ignore_index=True)
+    result = fit_dataset(df, args.column, args.project)
+    result.to_csv(args.output, sep=' ', index=False)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result.to_string(index=False, float_format=lambda v: "%.4g" % v))
+    print("Wrote the fits of " + str(len(result)) + " curves to " + args.output)
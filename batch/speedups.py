@@ -0,0 +1,168 @@
+#! /usr/bin/env python3
+
+'''
+Speedups of benchmark runs over any reference: a solver (solver=direct), a
+matrix format (matrix_format=csr), a processor (processor=skylake), or any
+other value of a run column such as a block solver run.
+
+Each run is matched with the reference run of the same case and batch
+multiplier. The other columns of speedup_keys (solver, matrix format,
+processor) must match too, unless all reference runs share one value of them;
+e.g. every solver is compared with the direct solver, whatever the direct
+solver's matrix format. --match gives the matched columns explicitly.
+Repeated runs are reduced to their median time first, and all runs are matched
+with one hash join.
+
+The speedups are written as a long table, as a (case, run, batch multiplier)
+tensor in an .npz file with --tensor, and as one grouped bar chart per batch
+multiplier, e.g.
+    speedups.py --dir results --processor_from_dir --reference processor=skylake
+'''
+
+import argparse
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib import ticker as tkr
+
+from arguments import add_tree_arguments
+from build_dataset import build_dataset, read_table
+
+speedup_keys = ['case', 'solver', 'matrix_format', 'processor', 'batch_multiplier']
+# Columns matched with the reference unless the reference runs share one value
+attribute_keys = ['solver', 'matrix_format', 'processor']
+
+def parse_reference(text):
+    ''' 'column=value' to (column, value).
+    '''
+    column, value = text.split('=', 1)
+    if column not in speedup_keys + ['tolerance_type']:
+        raise ValueError("Cannot take the reference from column " + column)
+    return column, value
+
+def get_run_times(df, keys):
+    ''' Median time of each run, in order of first appearance. Runs without a
+    kernel apply time (such as block solvers) use their whole apply time.
+    '''
+    times = np.where(np.isnan(df['apply_time'].to_numpy(dtype=float)),
+            df['total_time'].to_numpy(dtype=float), df['apply_time'].to_numpy(dtype=float))
+    df = df[keys].assign(time=times)
+    for key in keys:
+        df[key] = df[key].astype(np.int64 if key == 'batch_multiplier' else str)
+    return df.groupby(keys, sort=False)['time'].median().reset_index()
+
+def get_match_keys(runs, column, value):
+    reference = runs[runs[column] == value]
+    keys = ['case', 'batch_multiplier']
+    for key in attribute_keys:
+        if key != column and reference[key].nunique() > 1:
+            keys.append(key)
+    return keys
+
+def compute_speedups(df, column, value, match=None):
+    ''' Returns a table of the speedup of every run over its reference run, with
+    the reference time, and the columns matched.
+    '''
+    keys = speedup_keys + ([column] if column not in speedup_keys else [])
+    runs = get_run_times(df, keys)
+    if match is None:
+        match = get_match_keys(runs, column, value)
+    is_reference = (runs[column] == value).to_numpy()
+    if not np.any(is_reference):
+        raise ValueError("No runs with " + column + " = " + value)
+    reference = runs[is_reference].groupby(match, sort=False)['time'].median()
+    speedups = runs[~is_reference].merge(reference.rename('reference_time').reset_index(), on=match,
+            how='inner')
+    speedups['speedup'] = speedups['reference_time']/speedups['time']
+    return speedups, match
+
+def get_run_labels(speedups, column):
+    ''' Label of each compared run: its values of the columns that vary between
+    compared runs, or else its value of the reference column.
+    '''
+    columns = [key for key in attribute_keys if speedups[key].nunique() > 1]
+    if len(columns) == 0:
+        columns = [column]
+    labels = speedups[columns[0]].astype(str)
+    for key in columns[1:]:
+        labels = labels + "-" + speedups[key].astype(str)
+    return labels
+
+def get_speedup_tensor(speedups, labels):
+    ''' Speedups as a (case, run, batch multiplier) array, NaN where a run is
+    missing, with the cases, run labels and batch multipliers along its axes.
+    '''
+    cases = np.array(sorted(speedups['case'].unique()))
+    runs, run_index = np.unique(labels.to_numpy(dtype=str), return_inverse=True)
+    # Runs in order of first appearance rather than sorted
+    first = np.full(len(runs), len(labels))
+    np.minimum.at(first, run_index, np.arange(len(labels)))
+    order = np.argsort(first)
+    rank = np.empty(len(runs), dtype=int)
+    rank[order] = np.arange(len(runs))
+    multipliers = np.unique(speedups['batch_multiplier'].to_numpy())
+    tensor = np.full((len(cases), len(runs), len(multipliers)), np.nan)
+    tensor[np.searchsorted(cases, speedups['case'].to_numpy(dtype=str)), rank[run_index],
+            np.searchsorted(multipliers, speedups['batch_multiplier'].to_numpy())] = \
+            speedups['speedup'].to_numpy()
+    return tensor, cases, runs[order], multipliers
+
+def plot_speedup_bars(speedups, cases, runs, ylabel, filename, label_prefix="", yticks=None):
+    ''' Grouped bar chart of a (case, run) array of speedups, on a log axis with
+    the given ticks, or automatic ones.
+    '''
+    x = np.arange(len(cases))
+    width = 0.8/max(len(runs), 1)
+    if len(runs) <= 3:
+        width = 0.24
+    fig,ax = plt.subplots()
+    for irun in range(len(runs)):
+        plt.bar(x + irun*width, speedups[:,irun], 0.8*width, align='edge', \
+                tick_label=list(cases), label=label_prefix + runs[irun])
+    ax.set_yscale('log')
+    if yticks is not None:
+        ax.set_yticks(yticks)
+    else:
+        ax.get_yaxis().set_major_locator(tkr.LogLocator(subs=(1.0, 2.0, 3.0, 5.0, 7.0)))
+        ax.get_yaxis().set_minor_formatter(tkr.NullFormatter())
+        # Case names under the middle of their group of bars
+        ax.set_xticks(x + 0.5*(len(runs) - 0.2)*width, list(cases))
+    ax.get_yaxis().set_major_formatter(tkr.ScalarFormatter())
+    plt.legend(loc="best", fontsize="medium")
+    plt.xlabel("Problem")
+    plt.ylabel(ylabel)
+    plt.grid('on')
+    plt.savefig(filename, dpi=200, bbox_inches='tight')
+    plt.close(fig)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description = "Speedups of all runs over a reference solver, format, processor or run")
+    parser.add_argument('--reference', default = "solver=direct",
+            help = "Reference runs as column=value, e.g. matrix_format=csr or processor=skylake")
+    parser.add_argument('--match', nargs='+', help = "Columns matched with the reference"
+            + " (default: case, batch_multiplier and the columns in which reference runs differ)")
+    parser.add_argument('--dataset', help = "Dataset from build_dataset.py; otherwise read --dir")
+    add_tree_arguments(parser, norm_type=False)
+    parser.add_argument('--output', default = "speedups.txt", help = "Table of all speedups")
+    parser.add_argument('--tensor', help = "Also write the speedup tensor to this .npz file")
+    parser.add_argument('--no_plots', action="store_true", help = "Do not draw the bar charts")
+    args = parser.parse_args()
+
+    column, value = parse_reference(args.reference)
+    if args.dataset is not None:
+        df = read_table(args.dataset)
+    else:
+        df = build_dataset(args.dir, args.run_type, args.processor, args.processor_from_dir)
+    speedups, match = compute_speedups(df, column, value, args.match)
+    print("Matched " + str(len(speedups)) + " runs with the runs of " + args.reference + " on "
+            + str(match))
+    speedups.to_csv(args.output, sep=' ', index=False)
+    labels = get_run_labels(speedups, column)
+    tensor, cases, runs, multipliers = get_speedup_tensor(speedups, labels)
+    if args.tensor is not None:
+        np.savez(args.tensor, speedups=tensor, cases=cases, runs=runs, batch_multipliers=multipliers)
+    if not args.no_plots:
+        for imult in range(len(multipliers)):
+            filename = "speedup-" + column + "-" + value + "-" + str(multipliers[imult]) + ".png"
+            plot_speedup_bars(tensor[:,:,imult], cases, runs, "Speedup w.r.t. " + value, filename)
+            print("Wrote " + filename)
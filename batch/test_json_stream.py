@@ -0,0 +1,105 @@
+'''
+Checks the incremental reader of json_stream.py against json.load, with chunks
+small enough that tokens and per-entry items are cut at every position. Run
+from this directory with
+    python -m unittest test_json_stream
+'''
+
+import io
+import json
+import unittest
+import numpy as np
+
+import json_stream
+
+def make_entries(values):
+    return {str(i): [value, 2*value] for i, value in enumerate(values)}
+
+sample = [
+    {
+        "problem": {"name": "quote \" backslash \\ tab \t unicode é 😀",
+            "rows": 54, "nonzeros": 2560, "scale": -1.5e-300, "huge": 6.02E+23, "zero": 0.0},
+        "batch_solver": {
+            "bicgstab": {
+                "matrix_format": "csr",
+                "num_batch_entries": 5,
+                "apply": {"components": {"setup": 1e-05, "apply_kernel": 2.5E-3},
+                    "time": 1.1e-3, "nested": {"deeper": {"list": [1, -2, 3.25, [], {}]}}},
+                "num_iters": make_entries([17, 29, 18, 6, 130]),
+                "residual_norm": make_entries([1e-10, 2.5E-11, 3.0e+2, -4.75e-8, 0.0]),
+                "rhs_norm": make_entries([1.0, 12345.678, 9e9, 1e-300, 7.0])
+            },
+            "gmres \"restarted\"": {
+                "flags": [True, False, None],
+                # No entry count: the per-entry arrays are grown while reading
+                "num_iters": make_entries(list(range(40))),
+                "residual_norm": make_entries([1.0/(i+1) for i in range(40)]),
+                "rhs_norm": {}
+            }
+        }
+    }
+]
+
+def expected_value(value, key=None):
+    ''' What json_stream.load returns for a value loaded by json.load.
+    '''
+    if key in json_stream.per_entry_dtypes and isinstance(value, dict):
+        first = [value[str(i)][0] for i in range(len(value))]
+        return np.array(first, dtype=json_stream.per_entry_dtypes[key])
+    if isinstance(value, dict):
+        return {k: expected_value(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [expected_value(v) for v in value]
+    return value
+
+class JsonStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.chunk_size = json_stream.chunk_size
+
+    def tearDown(self):
+        json_stream.chunk_size = self.chunk_size
+
+    def assert_same(self, result, expected, path="$"):
+        if isinstance(expected, np.ndarray):
+            self.assertIsInstance(result, np.ndarray, path)
+            self.assertEqual(result.dtype, expected.dtype, path)
+            np.testing.assert_array_equal(result, expected, path)
+        elif isinstance(expected, dict):
+            self.assertIsInstance(result, dict, path)
+            self.assertEqual(list(result.keys()), list(expected.keys()), path)
+            for key in expected:
+                self.assert_same(result[key], expected[key], path + "." + key)
+        elif isinstance(expected, list):
+            self.assertIsInstance(result, list, path)
+            self.assertEqual(len(result), len(expected), path)
+            for i in range(len(expected)):
+                self.assert_same(result[i], expected[i], path + "[" + str(i) + "]")
+        else:
+            self.assertEqual(type(result), type(expected), path)
+            self.assertEqual(result, expected, path)
+
+    def check(self, text):
+        expected = expected_value(json.loads(text))
+        for size in list(range(1, 24)) + [61, 64, 65, 127, 1 << 20]:
+            json_stream.chunk_size = size
+            with self.subTest(chunk_size=size):
+                self.assert_same(json_stream.load(io.StringIO(text)), expected)
+
+    def test_compact(self):
+        self.check(json.dumps(sample, ensure_ascii=False))
+
+    def test_indented(self):
+        self.check(json.dumps(sample, indent=4))
+
+    def test_escaped_ascii(self):
+        self.check(json.dumps(sample, ensure_ascii=True, separators=(',', ':')))
+
+    def test_hand_written(self):
+        # Escapes and number forms json.dumps never writes
+        self.check(r"""{"a\/b": "\u00e9\ud83d\ude00\"", "e": [1E2, -0e-0, 1e+2, 10.5E-1],
+            "batch_solver": {"cg": {"num_batch_entries": 2,
+            "num_iters": { "0" : [ 3 ] , "1":[4,5]},
+            "residual_norm": {"0": [1.5e-7, 1.0], "1": [-2E+3]}}}}""")
+
+if __name__ == "__main__":
+    unittest.main()
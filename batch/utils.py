@@ -1,19 +1,43 @@
 import numpy as np
 
+def reorder(arr, order):
+    ''' Returns a copy of arr with its rows (or elements) permuted by order.
+    '''
+    if hasattr(arr, 'iloc'):
+        return arr.iloc[order]
+    if isinstance(arr, list):
+        return [arr[i] for i in order]
+    return np.asarray(arr)[order]
+
+def reorder_inplace(arr, order):
+    ''' Permutes the rows (or elements) of arr by order, overwriting arr.
+    '''
+    if hasattr(arr, 'iloc'):
+        arr.iloc[:] = arr.iloc[order].to_numpy()
+    elif isinstance(arr, list):
+        arr[:] = [arr[i] for i in order]
+    else:
+        arr[...] = arr[order]
+
+def co_sort(base, *dependents, stable=True, inplace=False):
+    ''' Sorts base in ascending order and applies the same permutation to every
+    dependent, in O(N log N) overall.
+    base and the dependents may be NumPy arrays (permuted along the first axis),
+    lists, or pandas Series/DataFrames (permuted by position).
+    @param stable   If True, entries with equal keys keep their relative order.
+    @param inplace  If True, overwrite base and dependents and return the permutation.
+                    Otherwise return sorted copies as (base, dependent0, dependent1, ...).
+    '''
+    order = np.argsort(np.asarray(base), kind='stable' if stable else 'quicksort')
+    for dep in dependents:
+        assert(len(dep) == len(order))
+    if inplace:
+        reorder_inplace(base, order)
+        for dep in dependents:
+            reorder_inplace(dep, order)
+        return order
+    return tuple([reorder(base, order)] + [reorder(dep, order) for dep in dependents])
+
 def sort_multiple(base, dependent):
-    # Simple insertion sort
-    # depenent is a numpy 2D array
-    N = len(base)
-    m = dependent.shape[1]
-    for i in range(N-1):
-        maxn = 0
-        for j in range(N-i):
-            if base[j] > base[maxn]:
-                maxn = j
-        temp = base[maxn]
-        base[maxn] = base[N-i-1]
-        base[N-i-1] = temp
-        temp = np.zeros((1,m))
-        temp[0,:] = dependent[maxn,:]
-        dependent[maxn,:] = dependent[N-i-1,:]
-        dependent[N-i-1,:] = temp[0,:]
+    # Sorts base in place, and the rows of the numpy 2D array dependent along with it
+    co_sort(base, dependent, inplace=True)
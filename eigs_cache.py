@@ -0,0 +1,48 @@
+'''
+Content-addressed on-disk cache of computed spectra.
+
+A spectrum is stored as a complex .npy array in .eigs_cache, named by a hash of
+the matrix file's content and the settings it was computed with. Any script
+asking for the same matrix with the same settings gets the stored array back
+instead of decomposing the matrix again. The content hash is kept by
+matrix_store, so it is only recomputed when the .mtx changes.
+'''
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from spectrum import compute_eigenvalues, check_real_parts
+from matrix_store import load_matrix, get_matrix_hash
+
+cache_dirname = ".eigs_cache"
+
+def get_cache_key(filename, settings):
+    settings_string = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha1((get_matrix_hash(filename) + settings_string).encode()).hexdigest()
+
+def get_spectrum(filename, settings, use_cache=True, cachedir=cache_dirname):
+    ''' Returns the eigenvalues of the matrix in filename computed with the given
+    compute_eigenvalues settings, from the cache if available, or None if no
+    eigenvalues could be computed. Only validated spectra are cached, so a failed
+    computation is tried again next time.
+    '''
+    w = None
+    if use_cache:
+        cachepath = os.path.join(cachedir, get_cache_key(filename, settings) + ".npy")
+        if os.path.isfile(cachepath):
+            print("Using cached spectrum " + cachepath)
+            w = np.load(cachepath)
+    cached = w is not None
+    if not cached:
+        A = load_matrix(filename)
+        w = compute_eigenvalues(A, **settings)
+    if not check_real_parts(w):
+        print("Skipping " + filename)
+        return None
+    if use_cache and not cached:
+        os.makedirs(cachedir, exist_ok=True)
+        np.save(cachepath + ".tmp.npy", w)
+        os.replace(cachepath + ".tmp.npy", cachepath)
+    return w
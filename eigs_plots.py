@@ -0,0 +1,101 @@
+'''
+Spectrum plots shared by the plot-eigs scripts: log10 of the real part against
+the imaginary part, the latter scaled to ~1 with the power of ten in the label.
+'''
+
+import math
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.collections import EllipseCollection
+
+textsize = 16
+ticknumsize = 12
+
+def get_imag_scaling(ymin, ymax):
+    ''' Returns the power of ten that scales the imaginary axis to ~1, and the
+    scaled axis limits with a 10% margin.
+    '''
+    if ymax > 0.0:
+        tenpow = math.floor(np.log10(ymax))
+    else:
+        tenpow = 0
+    ymax = ymax / math.pow(10,tenpow)
+    ymin = ymin / math.pow(10,tenpow)
+    yrange = ymax-ymin
+    ymax += 0.1*yrange
+    ymin -= 0.1*yrange
+    return tenpow, ymin, ymax
+
+def plot_eigvals(w, casename, imageformatstring, suffix="-eigs"):
+    plt.close()
+    plt.rcParams.update({'font.size': textsize})
+    fig,ax = plt.subplots()
+    # Scale y-axis to ~1 and append the multiplier to the y label
+    tenpow, ymin, ymax = get_imag_scaling(w.imag.min(), w.imag.max())
+    plt.scatter(np.log10(w.real), w.imag/math.pow(10,tenpow))
+    #plt.xlabel("Log(10) real part", fontsize=textsize)
+    #plt.ylabel("Imaginary part", fontsize = textsize-1)
+    plt.xlabel("Log(10) real part")
+    y_label = "Imaginary part ($\\times 10^{" + str(int(tenpow)) + "}$)"
+    plt.ylabel(y_label)
+    plt.ylim(ymin, ymax)
+    #plt.xscale('log')
+    plt.grid('on')
+    plt.savefig(casename + suffix + "." + imageformatstring, dpi=200, bbox_inches='tight')
+
+def select_discs(centers, radii, max_discs):
+    ''' Picks at most about max_discs discs to draw: per bin of centre real parts,
+    the disc of largest radius. Smaller discs with nearby centres mostly lie inside it.
+    '''
+    if len(centers) <= max_discs:
+        return centers, radii
+    re = centers.real
+    span = max(re.max() - re.min(), 1e-300)
+    bins = np.minimum(((re - re.min()) / span * max_discs).astype(int), max_discs-1)
+    # Sort by bin and then by radius, and keep the last disc of each bin
+    order = np.lexsort((radii, bins))
+    last = np.flatnonzero(np.diff(bins[order], append=max_discs))
+    return centers[order[last]], radii[order[last]]
+
+def plot_bounds(bounds, casename, imageformatstring, max_discs=2000, suffix="-bounds"):
+    ''' Plots the Gershgorin discs, sampled numerical range boundary and extremal
+    estimates from spectral_bounds.compute_bounds. The real axis is linear, since
+    the bounds may well extend to non-positive real parts.
+    '''
+    plt.close()
+    plt.rcParams.update({'font.size': textsize})
+    fig,ax = plt.subplots()
+    centers, radii = select_discs(bounds['centers'], bounds['radii'], max_discs)
+    box = bounds['gershgorin_box']
+    ylo, yhi = box[2], box[3]
+    if bounds['fov_points'] is not None:
+        ylo = min(ylo, bounds['fov_points'].imag.min())
+        yhi = max(yhi, bounds['fov_points'].imag.max())
+    tenpow, ymin, ymax = get_imag_scaling(ylo, max(yhi, -ylo))
+    scale = math.pow(10,tenpow)
+    discs = EllipseCollection(2*radii, 2*radii/scale, np.zeros(len(radii)), units='xy',
+            offsets=np.column_stack((centers.real, centers.imag/scale)),
+            offset_transform=ax.transData, facecolors='none', edgecolors='0.6', linewidths=0.5)
+    ax.add_collection(discs)
+    plt.plot([], [], color='0.6', lw=0.5, label="Gershgorin discs")
+    if bounds['fov_points'] is not None:
+        fov = np.append(bounds['fov_points'], bounds['fov_points'][:1])
+        plt.plot(fov.real, fov.imag/scale, color='b', lw=1.5, label="Numerical range estimate")
+    if bounds['estimates'] is not None:
+        est = bounds['estimates']
+        plt.scatter(est.real, est.imag/scale, marker='x', color='r', label="Ritz values")
+    plt.axvline(bounds['re_min'], color='k', ls='--', lw=0.75)
+    plt.axvline(bounds['re_max'], color='k', ls='--', lw=0.75)
+    if bounds['re_min_estimate'] is not None:
+        plt.axvline(bounds['re_min_estimate'], color='r', ls=':', lw=0.75,
+                label="Real part estimates")
+        plt.axvline(bounds['re_max_estimate'], color='r', ls=':', lw=0.75)
+    plt.xlabel("Real part")
+    y_label = "Imaginary part ($\\times 10^{" + str(int(tenpow)) + "}$)"
+    plt.ylabel(y_label)
+    xmargin = 0.05*max(box[1] - box[0], 1e-300)
+    plt.xlim(box[0] - xmargin, box[1] + xmargin)
+    plt.ylim(ymin, ymax)
+    plt.legend(loc="best", fontsize="small")
+    plt.grid('on')
+    plt.savefig(casename + suffix + "." + imageformatstring, dpi=200, bbox_inches='tight')
@@ -0,0 +1,112 @@
+#! /usr/bin/env python3
+
+'''
+Binary CSR store for Matrix Market files.
+
+The first time a .mtx file is read, it is converted to a bundle of .npy arrays
+(indptr, indices, data) plus a small meta.json in .matrix_store/<file name>/.
+Later reads memory-map those arrays and wrap them in a CSR matrix without
+copying. The source's size and mtime are recorded in meta.json, and a bundle
+is rebuilt whenever its .mtx changes.
+
+Run this file directly to convert matrices ahead of time.
+'''
+
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+import scipy as sp
+import scipy.io
+import scipy.sparse
+
+store_dirname = ".matrix_store"
+array_names = ['indptr', 'indices', 'data']
+
+# The hash of batch/extract_cache.py, kept here so that this module does not
+# import from batch/
+def hash_file(filename):
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as infile:
+        while True:
+            chunk = infile.read(1 << 20)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def get_bundle_dir(filename):
+    dirname, basename = os.path.split(os.path.abspath(filename))
+    return os.path.join(dirname, store_dirname, basename)
+
+def read_meta(bundledir):
+    metapath = os.path.join(bundledir, "meta.json")
+    if not os.path.isfile(metapath):
+        return None
+    with open(metapath, 'r') as infile:
+        return json.load(infile)
+
+def is_up_to_date(filename, meta):
+    if meta is None:
+        return False
+    st = os.stat(filename)
+    return meta['source_size'] == st.st_size and meta['source_mtime'] == st.st_mtime_ns
+
+def convert(filename):
+    ''' Reads a Matrix Market file and writes its CSR bundle. Returns the bundle's metadata.
+    '''
+    print("Converting " + filename + " to binary CSR")
+    st = os.stat(filename)
+    A = sp.sparse.csr_matrix(sp.io.mmread(filename))
+    A.sum_duplicates()
+    A.sort_indices()
+    bundledir = get_bundle_dir(filename)
+    os.makedirs(bundledir, exist_ok=True)
+    # Remove the metadata first, so that an interrupted conversion is never taken as valid
+    metapath = os.path.join(bundledir, "meta.json")
+    if os.path.isfile(metapath):
+        os.remove(metapath)
+    for name in array_names:
+        np.save(os.path.join(bundledir, name + ".npy"), getattr(A, name))
+    meta = {'shape': list(A.shape), 'nnz': int(A.nnz), 'source_size': st.st_size,
+            'source_mtime': st.st_mtime_ns, 'source_hash': hash_file(filename)}
+    with open(metapath, 'w') as outfile:
+        json.dump(meta, outfile)
+    return meta
+
+def get_meta(filename):
+    ''' Returns the metadata of the up-to-date bundle of a .mtx file, converting if needed.
+    '''
+    meta = read_meta(get_bundle_dir(filename))
+    if not is_up_to_date(filename, meta):
+        meta = convert(filename)
+    return meta
+
+def get_matrix_hash(filename):
+    ''' Content hash of a .mtx file, computed only when its bundle is (re)built.
+    '''
+    return get_meta(filename)['source_hash']
+
+def load_matrix(filename):
+    ''' Returns the matrix in a .mtx file as a CSR matrix whose arrays are
+    read-only memory maps of its binary bundle.
+    '''
+    meta = get_meta(filename)
+    bundledir = get_bundle_dir(filename)
+    arrays = {}
+    for name in array_names:
+        arrays[name] = np.load(os.path.join(bundledir, name + ".npy"), mmap_mode='r')
+    A = sp.sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=tuple(meta['shape']), copy=False)
+    A.has_sorted_indices = True
+    return A
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: " + sys.argv[0] + " <matrix.mtx> ...")
+        exit(-1)
+    for filename in sys.argv[1:]:
+        meta = get_meta(filename)
+        print(filename + ": " + str(meta['shape'][0]) + " x " + str(meta['shape'][1]) + ", "
+                + str(meta['nnz']) + " nonzeros")
@@ -0,0 +1,93 @@
+#! /bin/env python3
+
+'''
+Computes the spectra of a whole batch of small matrices at once.
+
+All .mtx files in the current directory are grouped by size. Each group is
+decomposed in chunks that fit the memory budget, each chunk by one vectorized
+LAPACK call on a (chunk, n, n) array. Per-matrix statistics (smallest real part,
+spectral radius, imaginary extent) are written to a table, and the eigenvalues
+of each group are plotted together in the same style as plot-eigs-mtx.py.
+'''
+
+import os
+import argparse
+import numpy as np
+from matplotlib import pyplot as plt
+
+from spectrum import batch_eigenvalues, summarize_spectra
+from matrix_store import load_matrix, get_meta
+from eigs_plots import textsize, plot_eigvals
+
+summary_keys = ['min_real', 'max_real', 'spectral_radius', 'imag_extent']
+
+def group_by_size(filenames):
+    groups = {}
+    for filename in filenames:
+        shape = tuple(get_meta(filename)['shape'])
+        assert(shape[0] == shape[1])
+        if shape[0] not in groups:
+            groups[shape[0]] = []
+        groups[shape[0]].append(filename)
+    return groups
+
+def write_summary(outfilename, rows):
+    with open(outfilename, 'w') as outfile:
+        outfile.write("matrix rows " + " ".join(summary_keys) + "\n")
+        for row in rows:
+            outfile.write(" ".join(str(val) for val in row) + "\n")
+
+def plot_summary(summary, casename, imageformatstring):
+    plt.close()
+    plt.rcParams.update({'font.size': textsize})
+    plt.semilogy(summary['spectral_radius'], ls='', marker='x', label="spectral radius")
+    plt.semilogy(np.abs(summary['min_real']), ls='', marker='.', label="|smallest real part|")
+    plt.xlabel("Matrix index in the batch")
+    plt.legend(loc="best", fontsize="medium")
+    plt.grid('on')
+    plt.savefig(casename + "-eigs-summary." + imageformatstring, dpi=200, bbox_inches='tight')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Batched spectra of all .mtx matrices in the current directory")
+    parser.add_argument('--memory_mb', type=float, default=1024,
+            help = "Memory budget for the dense matrices decomposed at once")
+    parser.add_argument('--per_matrix', help = "Also plot each matrix's spectrum on its own",
+            action="store_true")
+    parser.add_argument('--output', default="eigs-batch-summary.txt", help = "Summary table file")
+    args = parser.parse_args()
+    memory_budget = int(args.memory_mb * (1 << 20))
+    imageformatstring = "png"
+
+    curdir = os.getcwd()
+    filenames = sorted([os.fsdecode(file) for file in os.listdir(curdir)
+            if os.fsdecode(file).endswith(".mtx")])
+    if len(filenames) == 0:
+        print("No .mtx files found in the current directory.")
+        exit()
+
+    groups = group_by_size(filenames)
+    rows = []
+    for n in sorted(groups):
+        group = groups[n]
+        print("Computing spectra of " + str(len(group)) + " matrices of size " + str(n))
+        matrices = [load_matrix(filename) for filename in group]
+        w = batch_eigenvalues(matrices, memory_budget)
+        summary = summarize_spectra(w)
+        for i in range(len(group)):
+            rows.append([group[i], n] + [summary[key][i] for key in summary_keys])
+        print("  Smallest real part " + str(np.min(summary['min_real']))
+                + ", largest spectral radius " + str(np.max(summary['spectral_radius']))
+                + ", largest imaginary extent " + str(np.max(summary['imag_extent'])))
+        casename = "batch-" + str(n)
+        plot_summary(summary, casename, imageformatstring)
+        nonpositive = np.flatnonzero(summary['min_real'] <= 0.0)
+        if len(nonpositive) > 0:
+            print("  " + str(len(nonpositive)) + " matrices have eigenvalues with non-positive"
+                    + " real part; not plotting the spectra on a log scale")
+            continue
+        plot_eigvals(w.ravel(), casename, imageformatstring)
+        if args.per_matrix:
+            for i in range(len(group)):
+                plot_eigvals(w[i], group[i].split('.')[0], imageformatstring)
+    write_summary(args.output, rows)
+    print("Wrote " + args.output)
@@ -0,0 +1,53 @@
+#! /bin/env python3
+
+'''
+Screens all .mtx matrices in the current directory with cheap spectral bounds
+instead of eigenvalue computations: Gershgorin discs, a sampled numerical range
+boundary and Arnoldi estimates of the extremal eigenvalues. It writes a
+summary table and one plot per matrix, and tells which matrices are proven, or
+likely, to have only eigenvalues with positive real part. re_min and re_max
+bound the real parts; the *_estimate columns are Krylov estimates of them.
+'''
+
+import os
+import argparse
+import numpy as np
+
+from spectral_bounds import compute_bounds, krylov_steps
+from matrix_store import load_matrix
+from eigs_plots import plot_bounds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Bound the spectra of all .mtx matrices in the current directory")
+    parser.add_argument('--num_angles', type=int, default=32,
+            help = "Number of directions at which to sample the numerical range; 0 to skip it")
+    parser.add_argument('--krylov_steps', type=int, default=krylov_steps,
+            help = "Number of Arnoldi/Lanczos steps; 0 for Gershgorin bounds only")
+    parser.add_argument('--max_discs', type=int, default=2000,
+            help = "Largest number of Gershgorin discs drawn per plot")
+    parser.add_argument('--no_plots', help = "Only write the summary table", action="store_true")
+    parser.add_argument('--output', default="eigs-bounds-summary.txt", help = "Summary table file")
+    args = parser.parse_args()
+    imageformatstring = "png"
+
+    curdir = os.getcwd()
+    filenames = sorted([os.fsdecode(file) for file in os.listdir(curdir)
+            if os.fsdecode(file).endswith(".mtx")])
+
+    with open(args.output, 'w') as outfile:
+        outfile.write("matrix rows re_min re_max re_min_estimate re_max_estimate max_estimate_abs positive\n")
+        for filename in filenames:
+            print("Found " + filename)
+            casename = filename.split('.')[0]
+            A = load_matrix(filename)
+            bounds = compute_bounds(A, args.num_angles, args.krylov_steps)
+            est_abs = np.max(np.abs(bounds['estimates'])) if bounds['estimates'] is not None else np.nan
+            print("  Real parts of eigenvalues in [" + str(bounds['re_min']) + ", "
+                    + str(bounds['re_max']) + "], estimated [" + str(bounds['re_min_estimate']) + ", "
+                    + str(bounds['re_max_estimate']) + "], all positive: " + bounds['positive'])
+            outfile.write(" ".join(str(val) for val in [filename, A.shape[0], bounds['re_min'],
+                bounds['re_max'], bounds['re_min_estimate'], bounds['re_max_estimate'], est_abs,
+                bounds['positive']]) + "\n")
+            if not args.no_plots:
+                plot_bounds(bounds, casename, imageformatstring, args.max_discs)
+    print("Wrote " + args.output)
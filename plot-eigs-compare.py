@@ -2,27 +2,23 @@
 
 import math
 import os
-import scipy as sp
-import scipy.io
-import scipy.linalg
+import argparse
 import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib import ticker as tkr
 
+from spectrum import add_spectrum_arguments, get_settings_from_args
+from eigs_cache import get_spectrum
+
 textsize = 16
 ticknumsize = 12
 
-def get_eigenvalues(A):
-    adense = A.toarray()
-    w = sp.linalg.eigvals(adense)
-    minreal = np.min(w.real)
-    print("Smallest real part of any eigenvalue = " + str(minreal))
-    if minreal < 0.0:
-        printf("NEGATIVE real part! Cannot plot x-axis on log scale")
-        exit(-1)
-    return w
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Plot the spectra of all .mtx matrices in the current directory together")
+    add_spectrum_arguments(parser)
+    args = parser.parse_args()
+    settings = get_settings_from_args(args)
+
     opts = { \
          "marklist" : ['o', 'x', '+', '^', 'v', '<', '>', 'd'],
          "colorlist" : ['k', 'b', 'r', 'g', 'c', 'm', 'orange', 'pink'],
@@ -35,12 +31,15 @@ if __name__ == "__main__":
     curdir = os.getcwd()
     ymin = 1000.0
     ymax = 0.0
+    spectra = {}
     for file in os.listdir(curdir):
         filename = os.fsdecode(file)
         if filename.endswith(".mtx"):
             print("Found " + filename)
-            A = sp.io.mmread(filename)
-            w = get_eigenvalues(A)
+            w = get_spectrum(filename, settings, not args.no_cache)
+            if w is None:
+                continue
+            spectra[filename] = w
             ymaxl = w.imag.max()
             yminl = w.imag.min()
             # Scale y-axis to ~1 and append the multiplier to the y label
@@ -60,11 +59,10 @@ if __name__ == "__main__":
     idat = 0
     for file in os.listdir(curdir):
         filename = os.fsdecode(file)
-        if filename.endswith(".mtx"):
+        if filename in spectra:
             split_ = filename.split('.')
             casename = split_[0]
-            A = sp.io.mmread(filename)
-            w = get_eigenvalues(A)
+            w = spectra[filename]
             imageformatstring = "png"
             #plt.scatter(np.log10(w.real), w.imag/math.pow(10,tenpow), label=casename,
             #        marker=opts['marklist'][idat], ms=opts['marksize'][idat])
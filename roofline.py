@@ -1,45 +1,274 @@
+#! /bin/env python3
+
+'''
+Roofline plot of batch solver runs against the ceilings of a machine.
+
+Every solver run in the benchmark JSON files of the current directory becomes
+one point. Its work and memory traffic are estimated from the problem size in
+the file (rows and nonzeros per matrix), the matrix format, the iteration counts
+(from detailed output, or --iters) and the cost model in solver_costs. Its
+throughput comes from the measured apply time.
+
+The ceilings are either measured here with a NumPy STREAM triad (memory
+bandwidth) and a matrix product (floating point peak), both on all cores as
+the CPU runs are, or read from a JSON
+file of the form
+    {"bandwidth": {"DRAM": 200.0, ...}, "compute": {"FP64 FMA": 3000.0, ...}}
+in GB/s and GFLOP/s, e.g. for a GPU the benchmarks ran on. --save_ceilings
+writes the measured ceilings in that form.
+'''
+
+import os
+import sys
+import time
+import json
+import argparse
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib import pyplot as plt
 
-data = np.genfromtxt("roofline.dat")
-
-rst = 3             # Starting row of "actual data"
-ndata = 4           # Number of points of actual data
-
-# Labels
-labels = ['roofline', 'gri30 - bicgstab', 'gri30 - gmres', 'isooctane - bicgstab', 'isooctane - gmres']
-
-"""
-The first three rows of the input file should define the roofline envelope:
-   2-------3
-  /
- /
-1
-Then, in further rows, the actual points corresponding to kernels follow.
-In any case, each point is given, in one row as
-     <arithmetic intensity>           <GFLOP/s>
-"""
-
-opts = { \
-     "marklist" : ['.', 'x', '+', '^', 'v', '<', '>', 'd'],
-     "colorlist" : ['k', 'b', 'r', 'g', 'c', 'm', 'orange', 'pink'],
-     "linetype" : ['-', '--', '-.', ':', '--', '-.', '--',':'],
-     "linewidth" : 0.75,
-     "marksize" : 6,
-     "markedgewidth" : 1 \
-     }
-
-fig,ax = plt.subplots()
-
-plt.plot(data[0:rst,0], data[0:rst,1], label=labels[0], ls='--',  ms=opts['marksize'])
-
-for row in range(rst,rst+ndata):
-    plt.plot(data[row,0], data[row,1], label = labels[row-2], ms = opts['marksize'], \
-            marker=opts['marklist'][row-2])
-ax.set_xscale("log")
-ax.set_yscale("log")
-plt.legend(loc="best", fontsize="medium")
-plt.grid()
-plt.xlabel("Arithmetic intensity")
-plt.ylabel("Throughput (GFLOP/s)")
-plt.show()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch"))
+from extract_cache import ExtractCache
+from json_loader import find_json_files, load_files
+from manifest import get_case_and_multiplier
+
+# Work per iteration of each solver: sparse matrix-vector products, and vector
+# operations (dot products, norms, axpys) over the rows of one system. Solver keys
+# are matched by substring, e.g. 'bicgstab-csr' uses the 'bicgstab' costs.
+solver_costs = {
+    'bicgstab': {'spmv': 2, 'vector_ops': 10},
+    'gmres': {'spmv': 1, 'vector_ops': 12},
+    'cg': {'spmv': 1, 'vector_ops': 5},
+    'richardson': {'spmv': 1, 'vector_ops': 2},
+}
+default_costs = {'spmv': 1, 'vector_ops': 4}
+
+# A vector operation does 2 flops per row and moves 3 doubles per row (as an axpy)
+vector_op_flops = 2
+vector_op_doubles = 3
+
+value_bytes = 8
+index_bytes = 4
+
+def get_solver_costs(solver_key):
+    for name in solver_costs:
+        if name in solver_key:
+            return solver_costs[name]
+    print("No cost model for solver " + solver_key + ", assuming " + str(default_costs))
+    return default_costs
+
+def get_spmv_cost(matrix_format, rows, nonzeros, batch_size):
+    ''' Flops and bytes of one matrix-vector product with one matrix of the batch.
+    All matrices of a batch share their sparsity pattern, so the index arrays are
+    counted once per batch.
+    '''
+    if matrix_format == 'dense':
+        return 2*rows*rows, rows*rows*value_bytes + 2*rows*value_bytes
+    if matrix_format == 'ell':
+        pattern_bytes = nonzeros*index_bytes
+    else:
+        pattern_bytes = nonzeros*index_bytes + (rows+1)*index_bytes
+    flops = 2*nonzeros
+    nbytes = nonzeros*value_bytes + 2*rows*value_bytes + pattern_bytes/max(batch_size, 1)
+    return flops, nbytes
+
+def get_direct_cost(rows):
+    ''' Flops and bytes of a dense LU factorization and solve of one matrix.
+    '''
+    return 2.0/3.0*rows**3 + 2*rows*rows, rows*rows*value_bytes + 2*rows*value_bytes
+
+def get_run_point(record, isolver, default_iters):
+    ''' Returns (arithmetic intensity, GFLOP/s) of one solver run, or None if the
+    file does not give enough to estimate its work.
+    '''
+    solver_key = record['solver_keys'][isolver]
+    rows = record['problem']['rows']
+    nonzeros = record['problem']['nonzeros']
+    batch_size = int(record['batch_sizes'][isolver])
+    apply_time = record['apply_kernel_times'][isolver]
+    if np.isnan(apply_time):
+        apply_time = record['apply_times'][isolver]
+    if rows is None or nonzeros is None or batch_size == 0 or np.isnan(apply_time):
+        return None
+    if 'direct' in solver_key:
+        flops, nbytes = get_direct_cost(rows)
+        return flops/nbytes, flops*batch_size/apply_time/1e9
+    if record['num_iters'] is not None:
+        total_iters = float(np.sum(record['num_iters'][isolver]))
+    elif default_iters is not None:
+        total_iters = float(default_iters*batch_size)
+    else:
+        return None
+    costs = get_solver_costs(solver_key)
+    spmv_flops, spmv_bytes = get_spmv_cost(record['matrix_formats'][isolver], rows, nonzeros,
+            batch_size)
+    flops = costs['spmv']*spmv_flops + costs['vector_ops']*vector_op_flops*rows
+    nbytes = costs['spmv']*spmv_bytes + costs['vector_ops']*vector_op_doubles*rows*value_bytes
+    return flops/nbytes, flops*total_iters/apply_time/1e9
+
+def get_core_count():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def measure_bandwidth(nbytes=1 << 28, repeats=5, threads=1):
+    ''' STREAM triad a = b + s*c in NumPy, in GB/s. NumPy does it in two passes
+    (a = s*c, then a += b) which together move five arrays. Elementwise NumPy
+    operations run on one thread but release the GIL, so each of the given
+    number of threads works on its own slice of the arrays.
+    '''
+    n = nbytes // (3*value_bytes)
+    a = np.empty(n)
+    b = np.empty(n)
+    c = np.empty(n)
+    bounds = np.linspace(0, n, threads+1).astype(np.int64)
+    slices = [slice(bounds[i], bounds[i+1]) for i in range(threads)]
+
+    def fill(part):
+        # First touch by the thread that uses the slice, which places its pages near it
+        a[part] = 0.0
+        b[part] = 1.0
+        c[part] = 2.0
+
+    def triad(part):
+        np.multiply(c[part], 3.0, out=a[part])
+        np.add(a[part], b[part], out=a[part])
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(fill, slices))
+        best = np.inf
+        for rep in range(repeats):
+            start = time.perf_counter()
+            list(pool.map(triad, slices))
+            best = min(best, time.perf_counter() - start)
+    return 5*n*value_bytes/best/1e9
+
+def measure_peak(n=2048, repeats=3):
+    ''' Double precision matrix product (BLAS, all threads) in GFLOP/s.
+    '''
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((n, n))
+    b = rng.standard_normal((n, n))
+    c = np.empty((n, n))
+    best = np.inf
+    for rep in range(repeats):
+        start = time.perf_counter()
+        np.matmul(a, b, out=c)
+        best = min(best, time.perf_counter() - start)
+    return 2.0*n**3/best/1e9
+
+def get_ceilings(args):
+    if args.ceilings is not None:
+        with open(args.ceilings, 'r') as infile:
+            return json.load(infile)
+    print("Measuring memory bandwidth and floating point peak..")
+    threads = args.threads if args.threads is not None else get_core_count()
+    bandwidth = measure_bandwidth(int(args.stream_mb*(1 << 20)), threads=threads)
+    ceilings = {'bandwidth': {'NumPy triad (' + str(threads)
+            + (' thread)' if threads == 1 else ' threads)'): bandwidth},
+            'compute': {'NumPy matmul': measure_peak()}}
+    if args.save_ceilings is not None:
+        with open(args.save_ceilings, 'w') as outfile:
+            json.dump(ceilings, outfile, indent=1)
+    return ceilings
+
+def plot_roofline(points, ceilings, opts, outfilename):
+    fig,ax = plt.subplots()
+    intensities = [point['intensity'] for point in points]
+    xmin = min(intensities + [0.1])/4
+    xmax = max(intensities + [10.0])*4
+    x = np.geomspace(xmin, xmax, 200)
+    iceil = 0
+    for bwname in ceilings['bandwidth']:
+        for peakname in ceilings['compute']:
+            roof = np.minimum(ceilings['bandwidth'][bwname]*x, ceilings['compute'][peakname])
+            plt.plot(x, roof, color='k', ls=opts['linetype'][iceil % len(opts['linetype'])],
+                    lw=opts['linewidth'], label=bwname + " / " + peakname)
+            iceil += 1
+    # Colour by solver and marker by case, with one legend entry for each
+    cases = sorted(set(point['case'] for point in points))
+    solvers = sorted(set(point['solver'] for point in points))
+    for point in points:
+        icase = cases.index(point['case'])
+        isolver = solvers.index(point['solver'])
+        plt.plot(point['intensity'], point['gflops'], ls='', ms=opts['marksize'],
+                mew=opts['markedgewidth'], marker=opts['marklist'][icase % len(opts['marklist'])],
+                color=opts['colorlist'][isolver % len(opts['colorlist'])])
+    for isolver in range(len(solvers)):
+        plt.plot([], [], ls='', marker='s', color=opts['colorlist'][isolver % len(opts['colorlist'])],
+                label=solvers[isolver])
+    for icase in range(len(cases)):
+        plt.plot([], [], ls='', marker=opts['marklist'][icase % len(opts['marklist'])], color='0.4',
+                mew=opts['markedgewidth'], label=cases[icase])
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    plt.legend(loc="upper left", bbox_to_anchor=(1.02, 1.0), fontsize="small")
+    plt.grid()
+    plt.xlabel("Arithmetic intensity (FLOP/byte)")
+    plt.ylabel("Throughput (GFLOP/s)")
+    plt.savefig(outfilename, dpi=200, bbox_inches='tight')
+
+if __name__ == "__main__":
+
+    opts = { \
+         "marklist" : ['.', 'x', '+', '^', 'v', '<', '>', 'd'],
+         "colorlist" : ['k', 'b', 'r', 'g', 'c', 'm', 'orange', 'pink'],
+         "linetype" : ['-', '--', '-.', ':', '--', '-.', '--',':'],
+         "linewidth" : 0.75,
+         "marksize" : 6,
+         "markedgewidth" : 1 \
+         }
+
+    parser = argparse.ArgumentParser(
+        description = "Roofline plot of the batch solver runs in the current directory")
+    parser.add_argument("--run_type", default = "batch_solver", help = "Run type in the JSON files")
+    parser.add_argument('--ceilings', help = "JSON file of bandwidth (GB/s) and compute (GFLOP/s) ceilings;"
+            + " measured on this machine if not given")
+    parser.add_argument('--save_ceilings', help = "Write the measured ceilings to this file")
+    parser.add_argument('--stream_mb', type=float, default=256,
+            help = "Total size of the bandwidth benchmark's arrays")
+    parser.add_argument('--threads', type=int,
+            help = "Threads of the bandwidth benchmark; all available cores if not given")
+    parser.add_argument('--iters', type=float,
+            help = "Iterations per system for files without detailed iteration counts")
+    parser.add_argument('--output', default = "roofline.png", help = "Output image")
+    parser.add_argument('--cache', help = "Reuse data extracted by earlier runs from unchanged files",
+            action="store_true")
+    args = parser.parse_args()
+
+    curdir = os.getcwd()
+    filenames = find_json_files(curdir)
+    if len(filenames) == 0:
+        print("No JSON files found in the current directory.")
+        exit()
+    cache = None
+    if args.cache:
+        cache = ExtractCache(curdir)
+    records = load_files(filenames, args.run_type, cache=cache)
+
+    points = []
+    for filename in filenames:
+        record = records[filename]
+        casename = get_case_and_multiplier(filename)[0]
+        for isolver in range(len(record['solver_keys'])):
+            solver_key = record['solver_keys'][isolver]
+            point = get_run_point(record, isolver, args.iters)
+            if point is None:
+                print("Skipping " + filename + " - " + solver_key
+                        + ": no problem size, apply time or iteration counts")
+                continue
+            label = solver_key
+            if record['matrix_formats'][isolver] not in ['', solver_key.split('-')[-1]]:
+                label += " (" + record['matrix_formats'][isolver] + ")"
+            points.append({'case': casename, 'solver': label, 'intensity': point[0],
+                'gflops': point[1]})
+            print(filename + " - " + label + ": " + str(round(point[0], 4)) + " FLOP/byte, "
+                    + str(round(point[1], 4)) + " GFLOP/s")
+
+    ceilings = get_ceilings(args)
+    for kind in ceilings:
+        for name in ceilings[kind]:
+            print("Ceiling " + name + ": " + str(round(ceilings[kind][name], 2))
+                    + (" GB/s" if kind == 'bandwidth' else " GFLOP/s"))
+    plot_roofline(points, ceilings, opts, args.output)
+    print("Wrote " + args.output)
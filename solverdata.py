@@ -0,0 +1,73 @@
+#! /usr/bin/env python3
+
+'''
+Single entry point for the scripts in this repository.
+
+    solverdata.py <command> [options of that command]
+
+runs the script of the command as if it had been called directly, in the
+current directory and with the remaining arguments; '<command> --help' shows
+its options. Only this file is loaded before dispatching, so each command pays
+only for the libraries its own script imports: table and strip never load
+matplotlib, pandas or scipy.
+'''
+
+import os
+import sys
+import runpy
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# Command: (script relative to this file, description)
+commands = {
+    'dataset': ("batch/build_dataset.py", "Collect all runs under a tree into one table"),
+    'store': ("batch/result_store.py", "Incremental SQLite database of runs"),
+    'stats': ("batch/run_stats.py", "Medians and confidence intervals of repeated runs"),
+    'compare': ("batch/compare_results.py", "Regressions between two result sets"),
+    'scaling': ("batch/scaling_model.py", "Fit batch size scaling and saturation"),
+    'table': ("batch/create_table_from_json.py", "Table of solve times per case"),
+    'timings': ("batch/plot-batch-timings-general.py", "Solve times against batch size"),
+    'old-timings': ("batch/plot-batch-json-timings.py", "Solve times from files without run types"),
+    'block': ("batch/plot-batch-block-json-timings.py", "Batched against block solver times"),
+    'iters': ("batch/plot-batch-json-iters.py", "Iteration counts per batch entry"),
+    'residuals': ("batch/plot-batch-json-residuals.py", "Residual norms per batch entry"),
+    'speedups': ("batch/plot-batch-json-speedups.py", "Speedups over a reference solver"),
+    'speedup-tables': ("batch/speedups.py", "Speedups over any reference as tables, tensors and bars"),
+    'formats': ("batch/plot-timings-matrix-formats.py", "Solve times per matrix format"),
+    'boxplot': ("batch/plot-boxplot.py", "Box plots from tables"),
+    'from-tables': ("batch/plot_from_tables.py", "Timing plots from tables"),
+    'strip': ("batch/remove_detailed_data_from_json.py", "Remove per-entry data from JSON files"),
+    'manifest': ("batch/manifest.py", "Index a result tree and select files from it"),
+    'cache': ("batch/extract_cache.py", "Inspect or clear the extraction cache"),
+    'eigs': ("plot-eigs-mtx.py", "Spectrum of each matrix"),
+    'eigs-compare': ("plot-eigs-compare.py", "Spectra of all matrices in one plot"),
+    'eigs-batch': ("plot-eigs-batch.py", "Batched spectra of many small matrices"),
+    'eigs-bounds': ("plot-eigs-bounds.py", "Cheap spectral bounds of each matrix"),
+    'matrix-store': ("matrix_store.py", "Convert matrices to the binary store"),
+    'roofline': ("roofline.py", "Roofline plot of the solver runs"),
+}
+
+def print_usage():
+    print("Usage: " + os.path.basename(sys.argv[0]) + " <command> [options]\n\nCommands:")
+    width = max(len(command) for command in commands) + 2
+    for command in commands:
+        print("  " + command.ljust(width) + commands[command][1])
+
+def run_command(command, args):
+    ''' Runs the script of a command as __main__, with args as its command line.
+    '''
+    script = os.path.join(rootdir, commands[command][0])
+    # The scripts import their sibling modules
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script] + args
+    runpy.run_path(script, run_name="__main__")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ['-h', '--help']:
+        print_usage()
+        exit()
+    if sys.argv[1] not in commands:
+        print("Unknown command " + sys.argv[1] + "\n")
+        print_usage()
+        exit(-1)
+    run_command(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,134 @@
+'''
+Cheap bounds on the spectrum of a sparse matrix, for screening large collections
+before computing any eigenvalues properly.
+
+Gershgorin discs come from one pass over the CSR arrays. Everything else comes
+from a fixed number k of Arnoldi or Lanczos steps, i.e. O(k*nnz) work:
+- k Arnoldi steps on A project it to a small Hessenberg matrix Hk. The eigenvalues
+  of Hk (Ritz values) estimate the extremal eigenvalues of A. The numerical range
+  (field of values) of Hk lies inside that of A, and its boundary is sampled at
+  all angles at once with one batched dense eigh.
+- k Lanczos steps on the Hermitian part (A + A^H)/2 estimate its extreme
+  eigenvalues. Every eigenvalue of A has its real part between those two.
+These estimates converge from inside, so they are a little optimistic for small k.
+Only the Gershgorin bounds are strict, and they are kept apart from the estimates.
+'''
+
+import numpy as np
+import scipy as sp
+import scipy.sparse
+
+# Default number of Krylov steps
+krylov_steps = 40
+
+def get_row_sums(A, values):
+    ''' Sums values (one per stored entry of the CSR matrix A) over each row.
+    '''
+    counts = np.diff(A.indptr)
+    sums = np.zeros(A.shape[0], dtype=values.dtype)
+    nonempty = counts > 0
+    if np.any(nonempty):
+        sums[nonempty] = np.add.reduceat(values, A.indptr[:-1][nonempty])
+    return sums
+
+def gershgorin_discs(A):
+    ''' Returns the centres and radii of the row Gershgorin discs of A, and of A's columns.
+    '''
+    A = sp.sparse.csr_matrix(A)
+    centers = A.diagonal()
+    absdiag = np.abs(centers)
+    radii = get_row_sums(A, np.abs(A.data)) - absdiag
+    col_radii = np.bincount(A.indices, weights=np.abs(A.data), minlength=A.shape[1]) - absdiag
+    # Rounding can leave tiny negative radii for rows holding only the diagonal
+    return centers, np.maximum(radii, 0.0), np.maximum(col_radii, 0.0)
+
+def get_disc_box(centers, radii):
+    ''' Bounding box [re_min, re_max, im_min, im_max] of a union of discs.
+    '''
+    return [np.min(centers.real - radii), np.max(centers.real + radii),
+            np.min(centers.imag - radii), np.max(centers.imag + radii)]
+
+def arnoldi(matvec, n, k, dtype=float, seed=0):
+    ''' k steps of Arnoldi with reorthogonalization, starting from a random vector.
+    Returns the (k, k) Hessenberg matrix; fewer steps if an invariant subspace is found.
+    '''
+    V = np.zeros((k+1, n), dtype=dtype)
+    H = np.zeros((k+1, k), dtype=dtype)
+    v = np.random.default_rng(seed).standard_normal(n).astype(dtype)
+    V[0] = v / np.linalg.norm(v)
+    for j in range(k):
+        w = matvec(V[j])
+        # Classical Gram-Schmidt, twice
+        for sweep in range(2):
+            h = V[:j+1].conj() @ w
+            w = w - h @ V[:j+1]
+            H[:j+1, j] += h
+        H[j+1, j] = np.linalg.norm(w)
+        if H[j+1, j] <= 1e-12 * np.linalg.norm(H[:j+2, j]):
+            return H[:j+1, :j+1]
+        V[j+1] = w / H[j+1, j]
+    return H[:k, :k]
+
+def numerical_range_boundary(Hk, num_angles=32):
+    ''' Samples the boundary of the numerical range of the small matrix Hk at
+    num_angles directions theta, all in one batched eigh of the Hermitian parts
+    of exp(i*theta)*Hk. Returns the boundary points.
+    '''
+    thetas = np.linspace(0.0, 2.0*np.pi, num_angles, endpoint=False)
+    rotated = np.exp(1j*thetas)[:, None, None] * Hk[None, :, :]
+    herm = 0.5*(rotated + rotated.conj().transpose(0, 2, 1))
+    lam, y = np.linalg.eigh(herm)
+    # Eigenvectors of the largest eigenvalues, one per angle
+    ymax = y[:, :, -1]
+    return np.einsum('ai,ij,aj->a', ymax.conj(), Hk, ymax)
+
+def hermitian_part_extremes(A, k=krylov_steps):
+    ''' Lanczos estimates of the smallest and largest eigenvalues of (A + A^H)/2,
+    which bound the real parts of the eigenvalues of A.
+    '''
+    AH = A.conj().T.tocsr()
+    def matvec(x):
+        return 0.5*(A @ x + AH @ x)
+    Tk = arnoldi(matvec, A.shape[0], min(k, A.shape[0]), A.dtype)
+    lam = np.linalg.eigvalsh(0.5*(Tk + Tk.conj().T))
+    return lam[0], lam[-1]
+
+def compute_bounds(A, num_angles=32, k=krylov_steps):
+    ''' All bounds and estimates for A in one dict. The real part of every eigenvalue
+    lies in [re_min, re_max], from the Gershgorin discs. re_min_estimate and
+    re_max_estimate are the Lanczos estimates of the extreme eigenvalues of the
+    Hermitian part, usually much tighter but not bounds, or None without Krylov
+    steps. 'positive' is 'proven' if the Gershgorin discs show all real parts to be
+    positive, 'likely' if only the Krylov estimates do, and 'no' otherwise.
+    '''
+    A = sp.sparse.csr_matrix(A)
+    bounds = {}
+    centers, radii, col_radii = gershgorin_discs(A)
+    bounds['centers'] = centers
+    bounds['radii'] = radii
+    bounds['col_radii'] = col_radii
+    row_box = get_disc_box(centers, radii)
+    col_box = get_disc_box(centers, col_radii)
+    # The spectrum lies in both the row and the column disc unions
+    bounds['gershgorin_box'] = [max(row_box[0], col_box[0]), min(row_box[1], col_box[1]),
+            max(row_box[2], col_box[2]), min(row_box[3], col_box[3])]
+    bounds['re_min'] = bounds['gershgorin_box'][0]
+    bounds['re_max'] = bounds['gershgorin_box'][1]
+    bounds['re_min_estimate'] = None
+    bounds['re_max_estimate'] = None
+    bounds['estimates'] = None
+    bounds['fov_points'] = None
+    if k > 0:
+        bounds['re_min_estimate'], bounds['re_max_estimate'] = hermitian_part_extremes(A, k)
+        dtype = complex if np.iscomplexobj(A.data) else float
+        Hk = arnoldi(lambda x: A @ x, A.shape[0], min(k, A.shape[0]), dtype)
+        bounds['estimates'] = np.linalg.eigvals(Hk)
+        if num_angles > 0:
+            bounds['fov_points'] = numerical_range_boundary(Hk, num_angles)
+    if bounds['re_min'] > 0.0:
+        bounds['positive'] = 'proven'
+    elif bounds['re_min_estimate'] is not None and bounds['re_min_estimate'] > 0.0:
+        bounds['positive'] = 'likely'
+    else:
+        bounds['positive'] = 'no'
+    return bounds
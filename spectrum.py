@@ -0,0 +1,187 @@
+'''
+Eigenvalue computation shared by the plot-eigs scripts.
+
+Small matrices get the full spectrum from a dense decomposition. Larger ones
+get a sparse approximation from ARPACK: the extremal eigenvalues (largest
+magnitude, largest/smallest real and imaginary parts) plus, via shift-invert,
+the eigenvalues nearest a set of target points. Parts that do not converge are
+retried with a larger Krylov subspace; if nothing converges at all, matrices
+small enough are decomposed densely after all, and others get no spectrum.
+'''
+
+import numpy as np
+import scipy as sp
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+
+# Matrices up to this many rows are decomposed densely in 'auto' mode
+dense_threshold = 2000
+
+extremal_parts = ['LM', 'LR', 'SR', 'LI', 'SI']
+
+# Cap on ARPACK restarts; parts of the spectrum that have not converged by then are
+# reported and returned as far as they got
+arpack_maxiter = 1000
+
+# Krylov subspace size of the retry of a part that did not converge, as a multiple of k
+arpack_retry_ncv_factor = 4
+
+# Matrices up to this many rows are decomposed densely if ARPACK finds no eigenvalues
+dense_fallback_threshold = 8000
+
+def get_dense_eigenvalues(A):
+    adense = A.toarray()
+    return sp.linalg.eigvals(adense)
+
+def run_arpack(A, k, **kwargs):
+    ''' Calls ARPACK's eigs, retrying once with a larger Krylov subspace if not
+    all eigenvalues converge. Returns whatever converged, which is nothing if
+    ARPACK or the factorization of a shift-invert fails.
+    '''
+    n = A.shape[0]
+    w = np.empty(0, dtype=complex)
+    for ncv in [None, min(n, max(arpack_retry_ncv_factor*k + 1, 40))]:
+        try:
+            return sp.sparse.linalg.eigs(A, k=k, ncv=ncv, maxiter=arpack_maxiter,
+                    return_eigenvectors=False, **kwargs)
+        except sp.sparse.linalg.ArpackNoConvergence as e:
+            print("  ARPACK converged only " + str(len(e.eigenvalues)) + " of " + str(k)
+                    + " eigenvalues for " + str(kwargs) + " with ncv = " + str(ncv))
+            if len(e.eigenvalues) > len(w):
+                w = e.eigenvalues
+        except (sp.sparse.linalg.ArpackError, RuntimeError) as e:
+            # e.g. a shift-invert target that is an eigenvalue, making A - sigma*I singular
+            print("  ARPACK failed for " + str(kwargs) + ": " + str(e))
+            break
+    return w
+
+def remove_duplicates(w):
+    ''' Merges eigenvalues found by more than one ARPACK run.
+    '''
+    if len(w) == 0:
+        return w
+    scale = max(np.max(np.abs(w)), 1e-300)
+    keys = np.round(w.real/scale, 10) + 1j*np.round(w.imag/scale, 10)
+    unique_keys, first = np.unique(keys, return_index=True)
+    return w[np.sort(first)]
+
+def get_sparse_eigenvalues(A, num_extremal=6, targets=[], num_near_target=6):
+    ''' Approximates the interesting parts of the spectrum without forming a dense matrix.
+    @param num_extremal     Number of eigenvalues from each end (see extremal_parts).
+    @param targets          Points (real or complex) near which to find eigenvalues.
+    @param num_near_target  Number of eigenvalues nearest each target.
+    '''
+    A = sp.sparse.csc_matrix(A)
+    n = A.shape[0]
+    # ARPACK needs k < n-1
+    kmax = n - 2
+    parts = []
+    for which in extremal_parts:
+        parts.append(run_arpack(A, min(num_extremal, kmax), which=which))
+    if len(targets) > 0:
+        # Shift-invert in complex arithmetic; with a real shift ARPACK only iterates on
+        # the real part of the inverse, which converges poorly near complex eigenvalues
+        Acomplex = A.astype(complex)
+    for target in targets:
+        parts.append(run_arpack(Acomplex, min(num_near_target, kmax), sigma=complex(target),
+                which='LM'))
+    w = remove_duplicates(np.concatenate(parts))
+    if len(w) == 0 and n <= dense_fallback_threshold:
+        print("  ARPACK found no eigenvalues; computing the full spectrum densely instead")
+        return get_dense_eigenvalues(A)
+    return w
+
+def compute_eigenvalues(A, mode='auto', threshold=dense_threshold, num_extremal=6, targets=[0.0],
+        num_near_target=6):
+    ''' Returns eigenvalues of A: all of them in 'dense' mode, a sparse approximation
+    in 'sparse' mode, and 'auto' chooses dense only for matrices up to threshold rows.
+    '''
+    n = A.shape[0]
+    if mode == 'dense' or (mode == 'auto' and n <= threshold):
+        return get_dense_eigenvalues(A)
+    print("Computing " + str(num_extremal) + " extremal eigenvalues of each kind and "
+            + str(num_near_target) + " near each of " + str(targets))
+    return get_sparse_eigenvalues(A, num_extremal, targets, num_near_target)
+
+def check_real_parts(w):
+    ''' Exits if any eigenvalue has a negative real part, as the plots use a log scale.
+    Returns False if there are no eigenvalues at all, and True otherwise.
+    '''
+    if len(w) == 0:
+        print("No eigenvalues were computed")
+        return False
+    minreal = np.min(w.real)
+    print("Smallest real part of any eigenvalue = " + str(minreal))
+    if minreal < 0.0:
+        print("NEGATIVE real part! Cannot plot x-axis on log scale")
+        exit(-1)
+    return True
+
+def get_eigenvalues(A, mode='auto', threshold=dense_threshold, num_extremal=6, targets=[0.0],
+        num_near_target=6):
+    ''' Eigenvalues of A as from compute_eigenvalues, checked for plotting on a
+    log scale, or None if none were found.
+    '''
+    w = compute_eigenvalues(A, mode, threshold, num_extremal, targets, num_near_target)
+    if not check_real_parts(w):
+        return None
+    return w
+
+def get_batch_chunk_size(n, memory_budget):
+    ''' Number of n x n matrices that fit the memory budget (bytes) at once: the
+    dense input, LAPACK's working copy of it and the complex eigenvalues.
+    '''
+    per_matrix = 2*n*n*8 + n*16
+    return max(1, memory_budget // per_matrix)
+
+def batch_eigenvalues(matrices, memory_budget=1 << 30):
+    ''' Returns all eigenvalues of a list of same-size sparse matrices as a (batch, n)
+    complex array. The matrices are densified in chunks into one (chunk, n, n) stack,
+    and each chunk is decomposed by a single vectorized LAPACK call.
+    '''
+    nbatch = len(matrices)
+    n = matrices[0].shape[0]
+    w = np.empty((nbatch, n), dtype=complex)
+    chunk = get_batch_chunk_size(n, memory_budget)
+    stack = np.empty((min(chunk, nbatch), n, n))
+    for start in range(0, nbatch, chunk):
+        end = min(start+chunk, nbatch)
+        stack[:end-start] = 0.0
+        for i in range(start, end):
+            matrices[i].toarray(out=stack[i-start])
+        w[start:end] = np.linalg.eigvals(stack[:end-start])
+    return w
+
+def summarize_spectra(w):
+    ''' Per-matrix statistics of a (batch, n) array of eigenvalues.
+    '''
+    summary = {}
+    summary['min_real'] = w.real.min(axis=1)
+    summary['max_real'] = w.real.max(axis=1)
+    summary['spectral_radius'] = np.abs(w).max(axis=1)
+    summary['imag_extent'] = w.imag.max(axis=1) - w.imag.min(axis=1)
+    return summary
+
+def add_spectrum_arguments(parser):
+    ''' Adds the options of get_eigenvalues to an argparse parser.
+    '''
+    parser.add_argument('--mode', default='auto', choices=['auto', 'dense', 'sparse'],
+            help = "Dense full spectrum, sparse partial spectrum, or dense only for small matrices")
+    parser.add_argument('--dense_threshold', type=int, default=dense_threshold,
+            help = "Largest number of rows decomposed densely in auto mode")
+    parser.add_argument('--num_extremal', type=int, default=6,
+            help = "Sparse mode: number of eigenvalues at each extreme of the spectrum")
+    parser.add_argument('--targets', type=complex, nargs='*', default=[0.0],
+            help = "Sparse mode: points near which to find eigenvalues, e.g. 0 1e3 5+2j")
+    parser.add_argument('--num_near_target', type=int, default=6,
+            help = "Sparse mode: number of eigenvalues nearest each target")
+    parser.add_argument('--no_cache', help = "Always recompute, ignoring the eigenvalue cache",
+            action="store_true")
+
+def get_settings_from_args(args):
+    ''' The arguments of compute_eigenvalues, as a dict.
+    '''
+    return {'mode': args.mode, 'threshold': args.dense_threshold,
+            'num_extremal': args.num_extremal, 'targets': args.targets,
+            'num_near_target': args.num_near_target}